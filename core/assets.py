@@ -0,0 +1,83 @@
+import json
+import mimetypes
+import os
+import stat
+from typing import Dict, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+
+# Файлы собирает scripts/build_assets.py
+STATIC_DIR = "static"
+MANIFEST_PATH = os.path.join(STATIC_DIR, "dist", "manifest.json")
+STATIC_URL = "/static"
+
+# Имя файла в dist/ меняется вместе с содержимым, поэтому кешировать его можно навсегда
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Варианты в порядке предпочтения: (Content-Encoding, суффикс файла)
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest: Optional[Dict[str, str]] = None
+
+
+def _load_manifest() -> Dict[str, str]:
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, encoding="utf-8") as f:
+                _manifest = json.load(f)
+        except FileNotFoundError:
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(path: str) -> str:
+    """URL файла из static/src: хешированная копия из манифеста или исходник, если сборки нет."""
+    hashed = _load_manifest().get(path)
+    if hashed:
+        return f"{STATIC_URL}/dist/{hashed}"
+    return f"{STATIC_URL}/src/{path}"
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles для dist/: вечный кеш и заранее сжатые варианты по Accept-Encoding.
+
+    Остальные файлы (например, исходники из src/ при работе без сборки)
+    отдаются как обычно, с обязательной перепроверкой кеша.
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        if not path.replace(os.sep, "/").startswith("dist/"):
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("Cache-Control", "no-cache")
+            return response
+
+        response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    async def _precompressed_response(self, path: str, scope) -> Optional[Response]:
+        if scope["method"] not in ("GET", "HEAD"):
+            return None
+        accepted = set()
+        for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+            encoding, _, params = item.strip().partition(";")
+            if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                accepted.add(encoding.strip().lower())
+
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                response = FileResponse(full_path, stat_result=stat_result, media_type=media_type)
+                response.headers["Content-Encoding"] = encoding
+                return response
+        return None
+
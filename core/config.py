@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,6 +11,61 @@ class Settings:
 
     # Gemini
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+    AI_MAX_CONCURRENT_CALLS = int(os.getenv("AI_MAX_CONCURRENT_CALLS", "4"))
+    AI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AI_QUEUE_TIMEOUT_SECONDS", "2"))
+    AI_CALL_TIMEOUT_SECONDS = float(os.getenv("AI_CALL_TIMEOUT_SECONDS", "20"))
+    AI_TOTAL_DEADLINE_SECONDS = float(os.getenv("AI_TOTAL_DEADLINE_SECONDS", "45"))
+    AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+    AI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5"))
+    AI_BREAKER_RESET_SECONDS = float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+
+    # Контекст из каталога для AI-чата
+    AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "800"))
+    AI_CONTEXT_MAX_POEMS = int(os.getenv("AI_CONTEXT_MAX_POEMS", "3"))
+    AI_CONTEXT_MIN_SCORE = float(os.getenv("AI_CONTEXT_MIN_SCORE", "0.15"))
+
+    # История AI-чата: горячее окно и архивирование
+    AI_HISTORY_CONTEXT_MESSAGES = int(os.getenv("AI_HISTORY_CONTEXT_MESSAGES", "20"))
+    AI_HISTORY_MAX_MESSAGES = int(os.getenv("AI_HISTORY_MAX_MESSAGES", "200"))
+    AI_HISTORY_MAX_AGE_DAYS = int(os.getenv("AI_HISTORY_MAX_AGE_DAYS", "30"))
+    AI_HISTORY_COMPACT_INTERVAL_SECONDS = int(os.getenv("AI_HISTORY_COMPACT_INTERVAL_SECONDS", str(6 * 3600)))
+    # Архивирование запускает каждый воркер; аренда в БД пускает только один прогон
+    AI_HISTORY_COMPACT_LEASE_SECONDS = int(os.getenv("AI_HISTORY_COMPACT_LEASE_SECONDS", "1800"))
+
+    # Рекомендации
+    RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "20"))
+    RECOMMENDATIONS_REFRESH_SECONDS = int(os.getenv("RECOMMENDATIONS_REFRESH_SECONDS", "3600"))
+
+    # Локальные индексы (TF-IDF и т.п.), общие для всех воркеров
+    INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(tempfile.gettempdir(), "sscollective"))
+
+    # Живые обновления каталога (SSE); REDIS_URL включает рассылку между воркерами
+    REDIS_URL = os.getenv("REDIS_URL")
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+    # Журнал изменений каталога
+    POEM_CHANGES_RETAIN = int(os.getenv("POEM_CHANGES_RETAIN", "1000"))
+    POEM_CHANGES_COMPACT_EVERY = int(os.getenv("POEM_CHANGES_COMPACT_EVERY", "100"))
+    # Пропуск в версиях моложе этого считается незавершённой транзакцией, а не откатом
+    POEM_CHANGES_GAP_GRACE_SECONDS = float(os.getenv("POEM_CHANGES_GAP_GRACE_SECONDS", "10"))
+
+    # Кеш каталога в памяти воркера; сверяется с версией журнала изменений
+    CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "60"))
+    # Сколько запрос ждёт Supabase, прежде чем отдать каталог из снимка на диске
+    CATALOG_UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("CATALOG_UPSTREAM_TIMEOUT_SECONDS", "2"))
+    # После ошибки upstream столько секунд каталог отдаётся из снимка без новых попыток
+    CATALOG_UPSTREAM_RETRY_SECONDS = float(os.getenv("CATALOG_UPSTREAM_RETRY_SECONDS", "5"))
+
+    # Профилирование запросов по требованию администратора
+    PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+
+    # Логирование: запись уходит в очередь, вывод в stdout делает фоновый поток
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Одинаковые сообщения: не больше LOG_DEDUP_BURST за окно, остальные только считаются
+    LOG_DEDUP_WINDOW_SECONDS = float(os.getenv("LOG_DEDUP_WINDOW_SECONDS", "60"))
+    LOG_DEDUP_BURST = int(os.getenv("LOG_DEDUP_BURST", "5"))
 
     # Google OAuth
     GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -1,6 +1,9 @@
+import logging
 from supabase import create_client, Client
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Проверка наличия переменных окружения
 if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
     raise RuntimeError("Supabase URL and Key must be set in the .env file")
@@ -19,5 +22,5 @@ def get_user(username: str):
             return response.data[0]
         return None
     except Exception as e:
-        print(f"Error getting user: {e}")
+        logger.error("Error getting user: %s", e)
         return None
@@ -0,0 +1,155 @@
+import atexit
+import contextvars
+import datetime
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from core.config import settings
+from core.serialization import dumps_json
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет в запись идентификатор текущего запроса (работает в потоке вызова)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DedupFilter(logging.Filter):
+    """Пропускает не больше `burst` одинаковых сообщений за окно `window` секунд.
+
+    Одинаковыми считаются записи с тем же логгером, уровнем, шаблоном сообщения
+    и типом исключения. Число подавленных копий попадает в поле `suppressed`
+    первой записи следующего окна.
+    """
+
+    def __init__(self, window: float, burst: int):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._seen: Dict[Tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        key = (record.name, record.levelno, str(record.msg), exc_type)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                suppressed = entry[2] if entry else 0
+                self._seen[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                if len(self._seen) > 10000:
+                    self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+                return True
+            entry[1] += 1
+            if entry[1] <= self.burst:
+                return True
+            entry[2] += 1
+            return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Кладёт запись в ограниченную очередь; при переполнении запись отбрасывается, а не ждёт."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументы подставляем сразу (объекты могут измениться), а JSON собирает фоновый поток
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "suppressed", None):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return dumps_json(entry).decode("utf-8")
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging():
+    """Настраивает корневой логгер: запросы только кладут запись в очередь, вывод — в фоне."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(DedupFilter(settings.LOG_DEDUP_WINDOW_SECONDS, settings.LOG_DEDUP_BURST))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+    # Клиент Supabase пишет каждый HTTP-запрос на уровне INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class RequestIdMiddleware:
+    """ASGI middleware: берёт X-Request-ID из запроса или создаёт новый и возвращает его в ответе."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-request-id", request_id.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
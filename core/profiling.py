@@ -0,0 +1,197 @@
+import cProfile
+import io
+import itertools
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Optional, List, Dict, Any, Set
+
+import jwt
+from starlette.requests import Request
+
+from core.config import settings
+
+# Рамки, в которых поток просто ждёт работы: такие сэмплы не интересны
+_IDLE_FUNCTIONS = {"wait", "select", "poll", "epoll", "_worker", "get", "accept", "run_forever"}
+# Долгие запросы (например, SSE) профилируем не дольше этого
+MAX_PROFILE_SECONDS = 30.0
+# Идёт ли сейчас захват cProfile; меняется только из потока event loop
+_cprofile_busy = False
+
+
+class StackSampler:
+    """Статистический профайлер: периодически снимает стеки всех потоков через sys._current_frames()."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="profiling-sampler")
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + MAX_PROFILE_SECONDS
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if not stack or stack[0].split(" ", 1)[0] in _IDLE_FUNCTIONS:
+                    continue
+                # Формат folded stacks (flamegraph.pl, speedscope): от корня к листу через «;»
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+
+class Profiler:
+    """Настройки выборочного профилирования и кольцевой буфер снятых профилей."""
+
+    def __init__(self):
+        self.active = False
+        self.routes: Set[str] = set()
+        self.users: Set[str] = set()
+        self.sample_rate = 0.0
+        self.mode = "sampler"
+        self.interval_ms = 5.0
+        self.profiles: deque = deque(maxlen=settings.PROFILING_MAX_PROFILES)
+        self._ids = itertools.count(1)
+
+    def configure(self, enabled: bool, routes: List[str], users: List[str], sample_percent: float, mode: str, interval_ms: float):
+        self.routes = set(routes)
+        self.users = set(users)
+        self.sample_rate = max(0.0, min(sample_percent, 100.0)) / 100
+        self.mode = mode
+        self.interval_ms = max(1.0, interval_ms)
+        self.active = enabled and bool(self.routes or self.users or self.sample_rate)
+
+    def settings_dict(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.active,
+            "routes": sorted(self.routes),
+            "users": sorted(self.users),
+            "sample_percent": self.sample_rate * 100,
+            "mode": self.mode,
+            "interval_ms": self.interval_ms,
+        }
+
+    @staticmethod
+    def _username(scope) -> Optional[str]:
+        token = Request(scope).cookies.get("access_token")
+        if not token:
+            return None
+        try:
+            if token.startswith("Bearer "):
+                token = token.split(" ")[1]
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+        except (jwt.PyJWTError, IndexError):
+            return None
+
+    def should_profile(self, scope) -> tuple[bool, Optional[str]]:
+        path = scope.get("path", "")
+        if any(path == route or path.startswith(route.rstrip("/") + "/") for route in self.routes):
+            return True, None
+        if self.users:
+            username = self._username(scope)
+            if username in self.users:
+                return True, username
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True, None
+        return False, None
+
+    def record(self, scope, username: Optional[str], duration: float, status: Optional[int], stacks: Counter, samples: int, pstats_text: Optional[str]):
+        self.profiles.append({
+            "id": next(self._ids),
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "username": username,
+            "status": status,
+            "started_at": time.time() - duration,
+            "duration_ms": round(duration * 1000, 1),
+            "mode": "cprofile" if pstats_text is not None else "sampler",
+            "samples": samples,
+            "stacks": stacks,
+            "pstats": pstats_text,
+        })
+
+    def get(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        for profile in self.profiles:
+            if profile["id"] == profile_id:
+                return profile
+        return None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        return [
+            {k: v for k, v in profile.items() if k not in ("stacks", "pstats")}
+            for profile in reversed(self.profiles)
+        ]
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware: при выключенном профилировании — одна проверка флага на запрос."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not profiler.active or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        selected, username = profiler.should_profile(scope)
+        if not selected:
+            return await self.app(scope, receive, send)
+
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        global _cprofile_busy
+        started = time.perf_counter()
+        if profiler.mode == "cprofile" and not _cprofile_busy:
+            # cProfile видит только текущий поток, но это поток event loop: пока запрос ждёт
+            # await, в профиль попадают и все остальные запросы воркера. Отчёт — картина
+            # всего цикла за время запроса, а не только его обработчика.
+            # Второй профиль в том же потоке сломал бы первый (sys.setprofile один на поток),
+            # поэтому параллельные выбранные запросы уходят в семплер.
+            _cprofile_busy = True
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profile.disable()
+                _cprofile_busy = False
+                out = io.StringIO()
+                stats = pstats.Stats(profile, stream=out)
+                stats.sort_stats("cumulative").print_stats(60)
+                profiler.record(scope, username, time.perf_counter() - started, status, Counter(), 0, out.getvalue())
+            return
+
+        sampler = StackSampler(profiler.interval_ms / 1000)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            profiler.record(scope, username, time.perf_counter() - started, status, sampler.stacks, sampler.samples, None)
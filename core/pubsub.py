@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Optional, Dict, Any, Set
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Очередь событий одного подключённого клиента."""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # Клиент не успевает читать — отключаем его, EventSource переподключится
+        # и перечитает каталог, вместо того чтобы копить для него события
+        self.overflowed = False
+
+
+class Broker:
+    """In-process pub/sub с рассылкой по очередям подписчиков.
+
+    Если задан REDIS_URL и установлен пакет redis, события идут через канал
+    Redis, так что их получают клиенты всех воркеров.
+    """
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+        self._last_id = 0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if not settings.REDIS_URL:
+            return
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            logger.warning("REDIS_URL задан, но пакет redis не установлен: события рассылаются только внутри воркера")
+            return
+        self._redis = aioredis.from_url(settings.REDIS_URL)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._fan_out(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка подписки на канал Redis %s: %s", self.channel, e)
+                await asyncio.sleep(1)
+
+    def subscribe(self) -> Subscription:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        subscription = Subscription(settings.EVENTS_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _fan_out(self, event: Dict[str, Any]):
+        self._last_id += 1
+        event = {**event, "id": self._last_id}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+
+    def publish(self, event: Dict[str, Any]):
+        """Публикует событие; можно вызывать и из event loop, и из потоков threadpool."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        if self._redis is not None:
+            payload = json.dumps(event, ensure_ascii=False, default=str)
+            asyncio.run_coroutine_threadsafe(self._redis.publish(self.channel, payload), loop)
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(event)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, event)
+
+
+poem_events = Broker("poem_events")
@@ -0,0 +1,99 @@
+import datetime
+import json
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from markupsafe import Markup
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него работает стандартный json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+
+def dumps_json(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def dumps_msgpack(data: Any) -> bytes:
+    return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+def wants_msgpack(request: Request) -> bool:
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ через orjson (если установлен) вместо стандартного encoder'а."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class SerializedPayload:
+    """Данные вместе с лениво закешированными байтами в каждом формате.
+
+    Держится столько же, сколько сами данные (например, одна версия каталога),
+    поэтому сериализация выполняется один раз на версию, а не на каждый запрос.
+    """
+
+    def __init__(self, data: Any):
+        self.data = data
+        self._json: Optional[bytes] = None
+        self._msgpack: Optional[bytes] = None
+        self._html: Optional[Markup] = None
+
+    @property
+    def json(self) -> bytes:
+        if self._json is None:
+            self._json = dumps_json(self.data)
+        return self._json
+
+    @property
+    def msgpack(self) -> bytes:
+        if self._msgpack is None:
+            self._msgpack = dumps_msgpack(self.data)
+        return self._msgpack
+
+    @property
+    def html(self) -> Markup:
+        """JSON, безопасный для вставки в <script>, как фильтр tojson в Jinja."""
+        if self._html is None:
+            text = self.json.decode("utf-8")
+            text = (
+                text.replace("<", "\\u003c")
+                .replace(">", "\\u003e")
+                .replace("&", "\\u0026")
+                .replace("'", "\\u0027")
+            )
+            self._html = Markup(text)
+        return self._html
+
+
+def negotiated_response(request: Request, payload: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """Отдаёт MessagePack, если клиент просит его в Accept, иначе JSON."""
+    if not isinstance(payload, SerializedPayload):
+        payload = SerializedPayload(payload)
+    headers = {"Vary": "Accept", **(headers or {})}
+    if wants_msgpack(request):
+        return Response(payload.msgpack, status_code=status_code, media_type="application/msgpack", headers=headers)
+    return Response(payload.json, status_code=status_code, media_type="application/json", headers=headers)
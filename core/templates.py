@@ -0,0 +1,7 @@
+from fastapi.templating import Jinja2Templates
+
+from core.assets import asset_url
+
+# Один экземпляр на приложение: окружение Jinja и кеш скомпилированных шаблонов общие
+templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url
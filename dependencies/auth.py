@@ -1,3 +1,4 @@
+import logging
 from fastapi import Depends, HTTPException, status, Request
 import jwt
 from core.config import settings
@@ -5,6 +6,8 @@ from core.database import get_db, get_user
 from supabase import Client
 from services.auth_service import AuthService
 
+logger = logging.getLogger(__name__)
+
 def get_current_user(request: Request, db: Client = Depends(get_db)):
     token = request.cookies.get("access_token")
     if not token:
@@ -34,7 +37,7 @@ def get_current_user(request: Request, db: Client = Depends(get_db)):
         return user
         
     except (jwt.PyJWTError, IndexError, jwt.exceptions.DecodeError) as e:
-        print(f"JWT Error: {e}")
+        logger.error("JWT Error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_307_TEMPORARY_REDIRECT,
             headers={"Location": "/login"},
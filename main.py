@@ -1,26 +1,61 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.sessions import SessionMiddleware
 from dotenv import load_dotenv
 
 # Загружаем .env
 load_dotenv()
 
+# Логирование настраиваем до импорта модулей, которые пишут в лог при загрузке
+from core.logger import setup_logging, RequestIdMiddleware
+setup_logging()
+
 # Импортируем роутеры
-from routers import auth, users, poems, admin, ai, google_auth
+from routers import auth, users, poems, admin, ai, google_auth, recommendations, events, review
 from core.database import get_db, supabase
 from core.config import settings
+from core.pubsub import poem_events
+from core.serialization import FastJSONResponse
+from core.profiling import ProfilingMiddleware
+from core.assets import AssetStaticFiles
+from services.ai_service import AIService
+from services.catalog_service import CatalogService
+
+async def compact_chat_history_periodically():
+    """Фоновое архивирование истории AI-чата раз в AI_HISTORY_COMPACT_INTERVAL_SECONDS."""
+    while True:
+        await asyncio.sleep(settings.AI_HISTORY_COMPACT_INTERVAL_SECONDS)
+        await run_in_threadpool(AIService.compact_chat_history, supabase)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await poem_events.start()
+    # Каталог с диска доступен сразу, сверка с Supabase идёт в фоне
+    await run_in_threadpool(CatalogService.warm_start, supabase)
+    compactor = None
+    if settings.AI_HISTORY_COMPACT_INTERVAL_SECONDS > 0:
+        compactor = asyncio.create_task(compact_chat_history_periodically())
+    yield
+    if compactor:
+        compactor.cancel()
+    await poem_events.stop()
 
-app = FastAPI(title="Сборник Стихов")
+app = FastAPI(title="Сборник Стихов", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Добавляем middleware для сессий, необходимо для Authlib
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
 
-# Настройка статических файлов и шаблонов
-# app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# Профилирование по запросу администратора (см. /admin/profiling)
+app.add_middleware(ProfilingMiddleware)
+
+# X-Request-ID для ответа и поля request_id в логах; добавляется последним, чтобы быть внешним
+app.add_middleware(RequestIdMiddleware)
+
+# Статика: собранные файлы из static/dist кешируются навсегда (см. scripts/build_assets.py)
+app.mount("/static", AssetStaticFiles(directory="static"), name="static")
 
 # Подключаем роутеры
 app.include_router(auth.router, tags=["auth"])
@@ -29,6 +64,9 @@ app.include_router(users.router, tags=["users"])
 app.include_router(poems.router, tags=["poems"])
 app.include_router(admin.router, tags=["admin"])
 app.include_router(ai.router, tags=["ai"])
+app.include_router(recommendations.router, tags=["recommendations"])
+app.include_router(events.router, tags=["events"])
+app.include_router(review.router, tags=["review"])
 
 @app.get("/")
 async def root():
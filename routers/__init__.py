@@ -3,5 +3,8 @@ from .users import router as users_router
 from .poems import router as poems_router
 from .admin import router as admin_router
 from .ai import router as ai_router
+from .recommendations import router as recommendations_router
+from .events import router as events_router
+from .review import router as review_router
 
-__all__ = ["auth_router", "users_router", "poems_router", "admin_router", "ai_router"]
+__all__ = ["auth_router", "users_router", "poems_router", "admin_router", "ai_router", "recommendations_router", "events_router", "review_router"]
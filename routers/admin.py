@@ -1,25 +1,37 @@
 from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from postgrest.exceptions import APIError
 from supabase import Client
 
 from core.database import get_db
-from schemas import PoemCreate
+from core.templates import templates
+from core.serialization import negotiated_response
+from schemas import PoemCreate, ProfilingSettings
+from core.profiling import profiler
 from services.poem_service import PoemService
+from services.catalog_service import CatalogService
+from services.duplicate_service import DuplicateService
 from dependencies.auth import get_admin_user
 
 router = APIRouter(prefix="", tags=["admin"])
 
+# Код ошибки PostgreSQL при нарушении уникальности (poem.title)
+UNIQUE_VIOLATION = "23505"
+
 @router.get("/admin_panel", response_class=HTMLResponse)
 async def admin_panel(request: Request, admin: dict = Depends(get_admin_user)):
-    from fastapi.templating import Jinja2Templates
-    templates = Jinja2Templates(directory="templates")
-    return templates.TemplateResponse("admin_panel.html", {"request": request, "current_user": admin})
+    return templates.TemplateResponse(request, "admin_panel.html", {"request": request, "current_user": admin})
 
 @router.get("/api/poems")
-async def get_all_poems_api(db: Client = Depends(get_db), admin: dict = Depends(get_admin_user)):
-    poems_resp = db.table('poem').select("*").execute()
-    poems_data = PoemService.process_poems_data(poems_resp.data or [])
-    return {"success": True, "poems": poems_data}
+async def get_all_poems_api(request: Request, db: Client = Depends(get_db), admin: dict = Depends(get_admin_user)):
+    catalog = CatalogService.get_catalog(db)
+    return negotiated_response(request, catalog.api_payload, headers=CatalogService.stale_headers(catalog))
+
+@router.get("/api/poems/duplicates")
+def get_duplicate_poems_report(db: Client = Depends(get_db), admin: dict = Depends(get_admin_user)):
+    poems_resp = db.table('poem').select("title, text").execute()
+    clusters = DuplicateService.duplicate_clusters(poems_resp.data or [])
+    return {"success": True, "clusters": clusters}
 
 @router.post("/add_poem")
 async def add_poem_post(
@@ -30,18 +42,30 @@ async def add_poem_post(
     if not all([poem_in.title, poem_in.author, poem_in.text]):
         raise HTTPException(status_code=400, detail="Все поля должны быть заполнены.")
 
-    if db.table('poem').select('title').eq('title', poem_in.title).execute().data:
-        raise HTTPException(status_code=409, detail=f'Стих с названием "{poem_in.title}" уже существует.')
+    duplicates = DuplicateService.find_duplicates(db, poem_in.text)
+
+    # Один запрос: занятое название отклоняет уникальный индекс, а не предварительный select.
+    # add_poem пишет стих и журнал изменений в одной транзакции и возвращает версию
+    try:
+        response = db.rpc('add_poem', {
+            "p_title": poem_in.title,
+            "p_author": poem_in.author,
+            "p_text": poem_in.text,
+        }).execute()
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=409, detail=f'Стих с названием "{poem_in.title}" уже существует.')
+        raise HTTPException(status_code=500, detail=f"Ошибка БД: {e.message}")
+
+    if not response.data:
+        raise HTTPException(status_code=500, detail="Не удалось добавить стих.")
 
     try:
-        new_poem_data = poem_in.dict()
-        response = db.table('poem').insert(new_poem_data).execute()
-        
-        if not response.data:
-             raise HTTPException(status_code=500, detail="Не удалось добавить стих.")
-
-        new_poem = PoemService.process_poem_data(response.data[0])
-        return {"success": True, "message": f'Стих "{new_poem["title"]}" успешно добавлен!', "poem": new_poem}
+        row = dict(response.data)
+        version, changes = row.pop('version', None), row.pop('changes', 1)
+        new_poem = PoemService.process_poem_data(row)
+        CatalogService.on_poem_saved(db, new_poem, version=version, changes=changes)
+        return {"success": True, "message": f'Стих "{new_poem["title"]}" успешно добавлен!', "poem": new_poem, "duplicates": duplicates}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка БД: {str(e)}")
 
@@ -52,39 +76,79 @@ async def edit_poem_post(
     db: Client = Depends(get_db),
     admin: dict = Depends(get_admin_user)
 ):
-    poem_to_edit = db.table('poem').select('title').eq('title', original_title).execute()
-    if not poem_to_edit.data:
-        raise HTTPException(status_code=404, detail="Стих для редактирования не найден.")
-        
     update_data = poem_in.dict()
 
     if not all(update_data.values()):
         raise HTTPException(status_code=400, detail="Все поля должны быть заполнены.")
-            
+
+    duplicates = DuplicateService.find_duplicates(db, poem_in.text, [original_title, poem_in.title])
+
+    # Один запрос: пустой ответ — стиха нет, нарушение уникальности — новое название занято.
+    # update_poem возвращает и автора до правки — он нужен счётчикам прогресса, —
+    # и версию журнала изменений, записанную в той же транзакции
+    try:
+        response = db.rpc('update_poem', {
+            "p_original_title": original_title,
+            "p_title": update_data["title"],
+            "p_author": update_data["author"],
+            "p_text": update_data["text"],
+        }).execute()
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=409, detail=f'Стих с новым названием "{update_data["title"]}" уже существует.')
+        raise HTTPException(status_code=500, detail=f"Ошибка БД: {e.message}")
+
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Стих для редактирования не найден.")
+
     try:
-        if update_data['title'] != original_title:
-            if db.table('poem').select('title').eq('title', update_data['title']).execute().data:
-                raise HTTPException(status_code=409, detail=f'Стих с новым названием "{update_data["title"]}" уже существует.')
-        
-        response = db.table('poem').update(update_data).eq('title', original_title).execute()
-        
-        if not response.data:
-             raise HTTPException(status_code=500, detail="Не удалось обновить стих.")
-        
-        updated_poem = PoemService.process_poem_data(response.data[0])
-        return {"success": True, "message": f'Стих "{updated_poem["title"]}" успешно обновлен!', "poem": updated_poem}
+        row = dict(response.data)
+        old_author = row.pop('old_author', None)
+        version, changes = row.pop('version', None), row.pop('changes', 1)
+        updated_poem = PoemService.process_poem_data(row)
+        CatalogService.on_poem_saved(db, updated_poem, original_title, old_author, version, changes)
+        return {"success": True, "message": f'Стих "{updated_poem["title"]}" успешно обновлен!', "poem": updated_poem, "duplicates": duplicates}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка БД: {str(e)}")
 
 @router.post("/delete_poem/{title}")
 async def delete_poem(title: str, db: Client = Depends(get_db), admin: dict = Depends(get_admin_user)):
-    poem_to_delete = db.table('poem').select('title').eq('title', title).execute()
-    if not poem_to_delete.data:
+    try:
+        response = db.rpc('delete_poem', {"p_title": title}).execute()
+    except APIError as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при удалении: {e.message}")
+
+    # delete_poem возвращает удалённую строку: пустой ответ означает, что стиха не было
+    if not response.data:
         raise HTTPException(status_code=404, detail="Стих не найден.")
-        
+
     try:
-        db.table('poem').delete().eq('title', title).execute()
+        CatalogService.on_poem_deleted(db, title, response.data.get('author'), response.data.get('version'))
         return {"success": True, "message": f"Стих '{title}' успешно удален."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при удалении: {str(e)}")
+
+@router.get("/admin/profiling")
+async def get_profiling(admin: dict = Depends(get_admin_user)):
+    return {"success": True, "settings": profiler.settings_dict(), "profiles": profiler.summaries()}
+
+@router.post("/admin/profiling")
+async def set_profiling(profiling_in: ProfilingSettings, admin: dict = Depends(get_admin_user)):
+    if profiling_in.mode not in ("sampler", "cprofile"):
+        raise HTTPException(status_code=400, detail="Режим должен быть sampler или cprofile.")
+    profiler.configure(
+        profiling_in.enabled, profiling_in.routes, profiling_in.users,
+        profiling_in.sample_percent, profiling_in.mode, profiling_in.interval_ms
+    )
+    return {"success": True, "settings": profiler.settings_dict()}
+
+@router.get("/admin/profiling/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: int, admin: dict = Depends(get_admin_user)):
+    """Профиль в формате folded stacks (flamegraph.pl, speedscope) или текстовый отчёт pstats."""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Профиль не найден.")
+    if profile["pstats"] is not None:
+        return PlainTextResponse(profile["pstats"])
+    return PlainTextResponse("\n".join(f"{stack} {count}" for stack, count in profile["stacks"].most_common()))
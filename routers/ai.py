@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from services.ai_service import AIService
+import math
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from services.ai_service import AIService, AIUnavailableError
 from dependencies.auth import get_current_user, get_admin_user
 from datetime import datetime, timedelta
 from pydantic import BaseModel
+from typing import Optional
 from supabase import Client
 from core.database import get_db
+from core.serialization import negotiated_response
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
@@ -43,8 +46,8 @@ def generate_key(
     return {"key": key}
 
 @router.get("/get_keys")
-def get_keys(current_user: dict = Depends(get_admin_user), db: Client = Depends(get_db)):
-    return AIService.get_keys_for_admin(db, current_user["username"])
+def get_keys(request: Request, current_user: dict = Depends(get_admin_user), db: Client = Depends(get_db)):
+    return negotiated_response(request, AIService.get_keys_for_admin(db, current_user["username"]))
 
 @router.post("/disable_key/{key}")
 def disable_key(key: str, current_user: dict = Depends(get_admin_user), db: Client = Depends(get_db)):
@@ -52,8 +55,26 @@ def disable_key(key: str, current_user: dict = Depends(get_admin_user), db: Clie
         return {"success": True, "message": "Key disabled"}
     raise HTTPException(status_code=404, detail="Key not found or could not be disabled")
 
+@router.get("/history")
+def chat_history(
+    before: Optional[str] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user),
+    db: Client = Depends(get_db)
+):
+    limit = max(1, min(limit, 100))
+    try:
+        return AIService.get_chat_page(db, current_user["username"], before, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при получении истории: {e}")
+
+@router.post("/history/compact")
+def compact_chat_history(current_user: dict = Depends(get_admin_user), db: Client = Depends(get_db)):
+    archived = AIService.compact_chat_history(db)
+    return {"success": True, "archived": archived}
+
 @router.post("/chat")
-def chat_with_ai(request: Request, prompt: str, current_user: dict = Depends(get_current_user), db: Client = Depends(get_db)):
+def chat_with_ai(request: Request, response: Response, prompt: str, poem_title: Optional[str] = None, current_user: dict = Depends(get_current_user), db: Client = Depends(get_db)):
     has_access = False
     username = current_user.get("username")
 
@@ -73,8 +94,24 @@ def chat_with_ai(request: Request, prompt: str, current_user: dict = Depends(get
     # Загружаем историю чата
     history = AIService.get_chat_history(db, username)
     
+    # Подмешиваем к вопросу только относящиеся к нему строфы из каталога;
+    # в историю сохраняется исходный вопрос, без контекста
+    grounded_prompt = AIService.build_grounded_prompt(db, prompt, poem_title)
+
     # Получаем ответ от модели
-    response_text = AIService.get_gemini_response(prompt, history)
+    timings = {}
+    try:
+        response_text = AIService.get_gemini_response(grounded_prompt, history, timings)
+    except AIUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    # Ожидание в очереди и время ответа upstream отдаём раздельно
+    response.headers["Server-Timing"] = (
+        f"ai-queue;dur={timings['queue_ms']:.1f}, ai-upstream;dur={timings['upstream_ms']:.1f}"
+    )
     
     # Сохраняем и вопрос, и ответ в историю
     AIService.save_chat_message(db, username, 'user', prompt)
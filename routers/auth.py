@@ -1,17 +1,19 @@
+import logging
 from fastapi import APIRouter, Request, Depends, Form, HTTPException, status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from supabase import Client
 from typing import Optional
 
 from core.database import get_db, get_user
 from core.config import settings
+from core.templates import templates
 from schemas import Token
 from services.auth_service import AuthService
 from dependencies.auth import get_current_user_optional
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="", tags=["auth"])
-templates = Jinja2Templates(directory="templates")
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_get(request: Request, current_user: Optional[dict] = Depends(get_current_user_optional)):
@@ -22,7 +24,7 @@ async def login_get(request: Request, current_user: Optional[dict] = Depends(get
     if request.query_params.get("msg") == "reg_success":
         context["success"] = "Регистрация прошла успешно! Вы можете войти."
         
-    return templates.TemplateResponse("login.html", context)
+    return templates.TemplateResponse(request, "login.html", context)
 
 @router.post("/login")
 async def login_post(
@@ -39,7 +41,7 @@ async def login_post(
             resp.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True, max_age=60*60*24)
             return resp
         else:
-            return templates.TemplateResponse("login.html", {"request": request, "error": "Неверный пароль администратора"})
+            return templates.TemplateResponse(request, "login.html", {"request": request, "error": "Неверный пароль администратора"})
 
     # 2. Проверка обычных пользователей
     try:
@@ -55,9 +57,9 @@ async def login_post(
                 resp.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True, max_age=60*60*24)
                 return resp
     except Exception as e:
-        print(f"Ошибка входа: {e}")
+        logger.error("Ошибка входа: %s", e)
 
-    return templates.TemplateResponse("login.html", {"request": request, "error": "Неверное имя пользователя или пароль"})
+    return templates.TemplateResponse(request, "login.html", {"request": request, "error": "Неверное имя пользователя или пароль"})
 
 @router.get("/logout")
 async def logout():
@@ -69,7 +71,7 @@ async def logout():
 async def register_get(request: Request, current_user: Optional[dict] = Depends(get_current_user_optional)):
     if current_user:
         return RedirectResponse(url="/profile", status_code=status.HTTP_302_FOUND)
-    return templates.TemplateResponse("register.html", {"request": request})
+    return templates.TemplateResponse(request, "register.html", {"request": request})
 
 @router.post("/register", response_class=HTMLResponse)
 async def register_post(
@@ -79,13 +81,13 @@ async def register_post(
     password: str = Form(...)
 ):
     if len(password) < 4:
-        return templates.TemplateResponse("register.html", {
+        return templates.TemplateResponse(request, "register.html", {
             "request": request,
             "error": "Пароль должен быть не менее 4 символов."
         })
 
     if get_user(username):
-        return templates.TemplateResponse("register.html", {
+        return templates.TemplateResponse(request, "register.html", {
             "request": request,
             "error": "Пользователь с таким именем уже существует!"
         })
@@ -98,7 +100,7 @@ async def register_post(
             "password_hash": hashed_password
         }).execute()
     except Exception as e:
-        return templates.TemplateResponse("register.html", {
+        return templates.TemplateResponse(request, "register.html", {
             "request": request, "error": f"Ошибка регистрации: {e}"
         })
 
@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from core.config import settings
+from core.pubsub import poem_events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+@router.get("/poems")
+async def poem_events_stream(request: Request):
+    """Server-Sent Events с изменениями каталога: added / updated / deleted."""
+    subscription = poem_events.subscribe()
+
+    async def stream():
+        try:
+            # Клиент переподключается сам; подсказываем интервал
+            yield "retry: 5000\n\n"
+            while True:
+                if subscription.overflowed or await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Комментарий-heartbeat держит соединение открытым через прокси
+                    yield ": ping\n\n"
+                    continue
+                data = json.dumps(event, ensure_ascii=False, default=str)
+                yield f"id: {event['id']}\nevent: poem\ndata: {data}\n\n"
+        finally:
+            poem_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
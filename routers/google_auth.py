@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, Request, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse
 from authlib.integrations.starlette_client import OAuth
@@ -7,6 +8,8 @@ from core.config import settings
 from core.database import get_db
 from services.auth_service import AuthService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/google", tags=["google_auth"])
 
 # Проверка наличия ключей в конфигурации
@@ -75,6 +78,6 @@ async def google_auth_callback(request: Request, db: Client = Depends(get_db)):
         return response
 
     except Exception as e:
-        print(f"Ошибка аутентификации Google: {e}")
+        logger.error("Ошибка аутентификации Google: %s", e)
         # В случае ошибки перенаправляем на страницу входа с сообщением
         return RedirectResponse(url="/login?error=google_auth_failed", status_code=status.HTTP_303_SEE_OTHER)
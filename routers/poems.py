@@ -5,10 +5,16 @@ from typing import Optional
 import json
 
 from core.database import get_db
-from schemas import ToggleModel
+from core.templates import templates
+from schemas import ToggleModel, BulkReadModel
 from services.auth_service import AuthService
 from services.user_service import UserService
-from services.poem_service import PoemService
+from services.recommendation_service import RecommendationService
+from services.similarity_service import SimilarityService
+from services.progress_service import ProgressService
+from services.changelog_service import ChangeLogService
+from services.catalog_service import CatalogService
+from core.serialization import negotiated_response
 from dependencies.auth import get_current_user, get_current_user_optional
 
 router = APIRouter(prefix="", tags=["poems"])
@@ -19,11 +25,7 @@ async def read_root(
     db: Client = Depends(get_db), 
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
-    from fastapi.templating import Jinja2Templates
-    templates = Jinja2Templates(directory="templates")
-    
-    poems_response = db.table('poem').select("*").execute()
-    poems = PoemService.process_poems_data(poems_response.data or [])
+    catalog = CatalogService.get_catalog(db)
 
     read_poems = []
     if current_user:
@@ -32,14 +34,15 @@ async def read_root(
 
     context = {
         "request": request,
-        "poems": poems,
+        "poems_json": catalog.poems_payload.html,
+        "catalog_version": catalog.version,
         "read_poems": read_poems,
         "pinned_title": current_user.get('pinned_poem_title') if current_user else None,
         "is_admin": current_user.get('is_admin', False) if current_user else False,
         "show_all_tab": current_user.get('show_all_tab', False) if current_user else False,
         "current_user": current_user,
     }
-    return templates.TemplateResponse("index.html", context)
+    return templates.TemplateResponse(request, "index.html", context, headers=CatalogService.stale_headers(catalog))
 
 @router.post("/toggle_read")
 async def toggle_read(
@@ -52,19 +55,70 @@ async def toggle_read(
     # Проверяем, является ли пользователь виртуальным админом
     if AuthService.is_virtual_admin(username):
         action = AuthService.toggle_virtual_admin_read_status(username, toggle_data.title)
+        RecommendationService.update_user(username, current_user['read_poems_json'], current_user.get('pinned_poem_title'))
         return {"success": True, "action": action}
     
-    poem_resp = db.table('poem').select('title').eq('title', toggle_data.title).execute()
+    poem_resp = db.table('poem').select('title, author').eq('title', toggle_data.title).execute()
     if not poem_resp.data:
         raise HTTPException(status_code=404, detail="Стих не найден")
 
     try:
         read_list = UserService.parse_read_poems_json(current_user.get('read_poems_json', []))
-        action, new_read_list = UserService.toggle_poem_read_status(db, current_user['username'], toggle_data.title, read_list)
+        progress = ProgressService.ensure_stats(db, current_user, read_list)
+        action, new_read_list = UserService.toggle_poem_read_status(
+            db, current_user['username'], toggle_data.title, read_list,
+            progress=progress, author=poem_resp.data[0].get('author'),
+            pinned_title=current_user.get('pinned_poem_title')
+        )
+        RecommendationService.update_user(username, new_read_list, current_user.get('pinned_poem_title'))
         return {"success": True, "action": action}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при обновлении БД: {str(e)}")
 
+@router.post("/bulk_read")
+async def bulk_read(
+    bulk_data: BulkReadModel,
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Отмечает прочитанными (или непрочитанными) список стихов или все стихи автора."""
+    if not bulk_data.titles and not bulk_data.author:
+        raise HTTPException(status_code=400, detail="Укажите названия стихов или автора")
+
+    # Названия и автора проверяем по снимку каталога в памяти, без запроса на каждый стих
+    titles = list(dict.fromkeys(bulk_data.titles))
+    try:
+        catalog = {p['title']: p.get('author', '') for p in CatalogService.get_catalog(db).poems}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при загрузке каталога: {str(e)}")
+    poems = {title: catalog[title] for title in titles if title in catalog} if titles else catalog
+    if bulk_data.author:
+        poems = {title: author for title, author in poems.items() if author == bulk_data.author}
+    if not poems:
+        raise HTTPException(status_code=404, detail="Стихи не найдены")
+    not_found = [title for title in titles if title not in poems]
+
+    username = current_user.get('username')
+    action = 'marked' if bulk_data.read else 'unmarked'
+
+    if AuthService.is_virtual_admin(username):
+        changed = AuthService.set_virtual_admin_read_status(username, list(poems), bulk_data.read)
+        RecommendationService.update_user(username, current_user['read_poems_json'], current_user.get('pinned_poem_title'))
+        return {"success": True, "action": action, "changed": changed, "not_found": not_found}
+
+    try:
+        read_list = UserService.parse_read_poems_json(current_user.get('read_poems_json', []))
+        progress = ProgressService.ensure_stats(db, current_user, read_list)
+        changed, new_read_list = UserService.set_poems_read_status(
+            db, username, poems, bulk_data.read, read_list, progress=progress,
+            pinned_title=current_user.get('pinned_poem_title')
+        )
+        if changed:
+            RecommendationService.update_user(username, new_read_list, current_user.get('pinned_poem_title'))
+        return {"success": True, "action": action, "changed": changed, "not_found": not_found}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при обновлении БД: {str(e)}")
+
 @router.post("/toggle_pin")
 async def toggle_pin(
     toggle_data: ToggleModel,
@@ -76,6 +130,7 @@ async def toggle_pin(
     # Проверяем, является ли пользователь виртуальным админом
     if AuthService.is_virtual_admin(username):
         action, new_pinned = AuthService.toggle_virtual_admin_pinned_poem(username, toggle_data.title)
+        RecommendationService.update_user(username, current_user['read_poems_json'], new_pinned)
         return {
             "success": True, 
             "action": action, 
@@ -88,7 +143,11 @@ async def toggle_pin(
 
     try:
         current_pinned = current_user.get('pinned_poem_title')
-        action, new_pinned = UserService.toggle_pinned_poem(db, current_user['username'], toggle_data.title, current_pinned)
+        read_list = UserService.parse_read_poems_json(current_user.get('read_poems_json', []))
+        action, new_pinned = UserService.toggle_pinned_poem(
+            db, current_user['username'], toggle_data.title, current_pinned, read_titles=read_list
+        )
+        RecommendationService.update_user(username, read_list, new_pinned)
         return {
             "success": True, 
             "action": action, 
@@ -96,3 +155,16 @@ async def toggle_pin(
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при обновлении БД: {str(e)}")
+
+@router.get("/poems/{title}/similar")
+def similar_poems(title: str, limit: int = 5, db: Client = Depends(get_db)):
+    limit = max(1, min(limit, 50))
+    similar = SimilarityService.find_similar(db, title, limit)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Стих не найден")
+    return {"success": True, "similar": similar}
+
+@router.get("/api/poems/changes")
+def poem_changes(request: Request, since: int = 0, db: Client = Depends(get_db)):
+    """Дельта каталога после версии `since`; при since=0 или сжатом журнале — полный снимок."""
+    return negotiated_response(request, {"success": True, **ChangeLogService.changes_since(db, since)})
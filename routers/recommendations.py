@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from supabase import Client
+
+from core.database import get_db
+from services.recommendation_service import RecommendationService
+from dependencies.auth import get_current_user
+
+router = APIRouter(prefix="", tags=["recommendations"])
+
+@router.get("/recommendations")
+def get_recommendations(
+    limit: int = 10,
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    limit = max(1, min(limit, 50))
+    recommendations = RecommendationService.get_recommendations(db, current_user, limit)
+    return {"success": True, "recommendations": recommendations}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException
+from supabase import Client
+
+from core.database import get_db
+from schemas import ReviewResult
+from services.review_service import ReviewService
+from dependencies.auth import get_current_user
+
+router = APIRouter(prefix="/review", tags=["review"])
+
+@router.get("/due")
+def get_due_reviews(
+    limit: int = 20,
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    limit = max(1, min(limit, 100))
+    due = ReviewService.get_due(db, current_user['username'], limit)
+    return {"success": True, "due": due}
+
+@router.post("")
+def record_review(
+    result: ReviewResult,
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        review = ReviewService.record_review(db, current_user['username'], result.title, result.quality)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при обновлении БД: {str(e)}")
+    if review is None:
+        raise HTTPException(status_code=404, detail="Стих не найден")
+    return {"success": True, "review": review}
@@ -1,25 +1,38 @@
+import logging
 from fastapi import APIRouter, Request, Depends, Form, HTTPException
 from fastapi.responses import HTMLResponse
 from supabase import Client
 from typing import Optional
 
 from core.database import get_db
+from core.templates import templates
 from services.auth_service import AuthService
 from services.user_service import UserService
+from services.progress_service import ProgressService
 from dependencies.auth import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="", tags=["users"])
 
 @router.get("/profile", response_class=HTMLResponse)
-async def profile_get(request: Request, current_user: dict = Depends(get_current_user)):
-    from fastapi.templating import Jinja2Templates
-    templates = Jinja2Templates(directory="templates")
-    
-    return templates.TemplateResponse("profile.html", {
+async def profile_get(request: Request, db: Client = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    read_list = UserService.parse_read_poems_json(current_user.get('read_poems_json', []))
+    try:
+        progress = ProgressService.get_progress(
+            db, current_user, read_list,
+            persist=not AuthService.is_virtual_admin(current_user.get('username'))
+        )
+    except Exception as e:
+        logger.error("Ошибка при получении статистики прогресса: %s", e)
+        progress = None
+
+    return templates.TemplateResponse(request, "profile.html", {
         "request": request, 
         "current_user": current_user, 
         "user_data": current_user.get('user_data', ''), 
-        "show_all_tab": current_user.get('show_all_tab', False)
+        "show_all_tab": current_user.get('show_all_tab', False),
+        "progress": progress
     })
 
 @router.post("/profile", response_class=HTMLResponse)
@@ -31,12 +44,10 @@ async def profile_post(
     user_data: Optional[str] = Form(None),
     show_all_tab: Optional[str] = Form(None)
 ):
-    from fastapi.templating import Jinja2Templates
-    templates = Jinja2Templates(directory="templates")
     
     # Проверяем, является ли пользователь виртуальным админом
     if AuthService.is_virtual_admin(current_user.get('username')):
-        return templates.TemplateResponse("profile.html", {
+        return templates.TemplateResponse(request, "profile.html", {
             "request": request, 
             "current_user": current_user,
             "user_data": current_user.get('user_data', ''),
@@ -48,7 +59,7 @@ async def profile_post(
     
     if new_password:
         if len(new_password) < 4:
-            return templates.TemplateResponse("profile.html", {
+            return templates.TemplateResponse(request, "profile.html", {
                 "request": request, 
                 "current_user": current_user, 
                 "user_data": current_user.get('user_data', ''),
@@ -69,13 +80,13 @@ async def profile_post(
             current_user.update(update_data)
 
         except Exception as e:
-            return templates.TemplateResponse("profile.html", {
+            return templates.TemplateResponse(request, "profile.html", {
                 "request": request, 
                 "current_user": current_user, 
                 "error": f"Ошибка обновления: {e}"
             })
 
-    return templates.TemplateResponse("profile.html", {
+    return templates.TemplateResponse(request, "profile.html", {
         "request": request, 
         "current_user": current_user, 
         "user_data": current_user.get('user_data', ''),
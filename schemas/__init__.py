@@ -1,11 +1,15 @@
 from .users import UserCreate, UserResponse, UserUpdate
 from .poems import PoemCreate, PoemResponse
-from .auth import Token, TokenData, ToggleModel
+from .auth import Token, TokenData, ToggleModel, BulkReadModel
 from .ai import AIAccessKey, AIChatMessage, AIChatSession, ChatMessage
+from .profiling import ProfilingSettings
+from .review import ReviewResult
 
 __all__ = [
     "UserCreate", "UserResponse", "UserUpdate",
     "PoemCreate", "PoemResponse",
-    "Token", "TokenData", "ToggleModel",
-    "AIAccessKey", "AIChatMessage", "AIChatSession", "ChatMessage"
+    "Token", "TokenData", "ToggleModel", "BulkReadModel",
+    "AIAccessKey", "AIChatMessage", "AIChatSession", "ChatMessage",
+    "ProfilingSettings",
+    "ReviewResult"
 ]
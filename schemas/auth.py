@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 
 class Token(BaseModel):
     access_token: str
@@ -10,3 +10,8 @@ class TokenData(BaseModel):
     
 class ToggleModel(BaseModel):
     title: str
+
+class BulkReadModel(BaseModel):
+    titles: List[str] = Field(default_factory=list, max_length=1000)
+    author: Optional[str] = None
+    read: bool = True
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List
+
+class ProfilingSettings(BaseModel):
+    enabled: bool = False
+    routes: List[str] = []
+    users: List[str] = []
+    sample_percent: float = 0.0
+    # "sampler" — стеки всех потоков; "cprofile" — детерминированный профиль всего
+    # event loop за время запроса (вместе с параллельными запросами), один за раз
+    mode: str = "sampler"
+    interval_ms: float = 5.0
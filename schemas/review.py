@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+
+class ReviewResult(BaseModel):
+    title: str
+    # Оценка SM-2: 0 — не вспомнил совсем, 5 — вспомнил без усилий
+    quality: int = Field(ge=0, le=5)
@@ -0,0 +1,58 @@
+"""Сборка статики: python scripts/build_assets.py
+
+Копирует файлы из static/src в static/dist с хешем содержимого в имени,
+рядом кладёт сжатые .gz и .br (если установлен пакет brotli) и пишет
+static/dist/manifest.json, по которому шаблоны находят файлы (core/assets.py).
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict
+
+try:
+    import brotli
+except ImportError:  # без brotli собираются только .gz
+    brotli = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "static", "src")
+DIST_DIR = os.path.join(ROOT_DIR, "static", "dist")
+
+
+def build_assets() -> Dict[str, str]:
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    manifest: Dict[str, str] = {}
+    for root, _, files in os.walk(SRC_DIR):
+        for name in sorted(files):
+            src_path = os.path.join(root, name)
+            rel_path = os.path.relpath(src_path, SRC_DIR).replace(os.sep, "/")
+            with open(src_path, "rb") as f:
+                data = f.read()
+
+            stem, ext = os.path.splitext(rel_path)
+            hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            dist_path = os.path.join(DIST_DIR, hashed)
+            os.makedirs(os.path.dirname(dist_path), exist_ok=True)
+            with open(dist_path, "wb") as f:
+                f.write(data)
+            # mtime=0: одинаковый исходник даёт побайтно одинаковый архив
+            with open(dist_path + ".gz", "wb") as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(dist_path + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+            manifest[rel_path] = hashed
+
+    with open(os.path.join(DIST_DIR, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    return manifest
+
+
+if __name__ == "__main__":
+    if brotli is None:
+        print("Пакет brotli не установлен: .br файлы не созданы")
+    for source, target in build_assets().items():
+        print(f"{source} -> {target}")
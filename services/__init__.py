@@ -1,6 +1,16 @@
 from .auth_service import AuthService
+from .progress_service import ProgressService
+from .review_service import ReviewService
 from .user_service import UserService
 from .poem_service import PoemService
 from .ai_service import AIService
+from .recommendation_service import RecommendationService
+from .similarity_service import SimilarityService
+from .duplicate_service import DuplicateService
+from .changelog_service import ChangeLogService
+from .catalog_service import CatalogService
 
-__all__ = ["AuthService", "UserService", "PoemService", "AIService"]
+__all__ = ["AuthService", "UserService", "PoemService", "AIService",
+           "RecommendationService", "SimilarityService", "DuplicateService",
+           "ProgressService", "ChangeLogService", "CatalogService",
+           "ReviewService"]
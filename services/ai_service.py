@@ -1,16 +1,64 @@
+import logging
+import base64
+import json
 import secrets
 import datetime
+import random
+import zlib
+from collections import defaultdict
+import threading
+import time
 from typing import Optional, List, Dict, Any
 from supabase import Client
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from core.config import settings
+from core.resilience import CircuitBreaker
+from services.poem_service import PoemService
+from services.similarity_service import SimilarityService
+from services.catalog_service import CatalogService
+
+logger = logging.getLogger(__name__)
 
 # Конфигурируем Gemini API
 try:
     # Исправлено на GOOGLE_API_KEY
     genai.configure(api_key=settings.GOOGLE_API_KEY)
 except Exception as e:
-    print(f"Ошибка при конфигурации Gemini API: {e}")
+    logger.error("Ошибка при конфигурации Gemini API: %s", e)
+
+# Ограничиваем число одновременных обращений к Gemini, чтобы медленный
+# upstream не занял все потоки общего threadpool Starlette
+_gemini_slots = threading.BoundedSemaphore(settings.AI_MAX_CONCURRENT_CALLS)
+gemini_breaker = CircuitBreaker(
+    failure_threshold=settings.AI_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.AI_BREAKER_RESET_SECONDS,
+)
+
+# Ошибки, при которых имеет смысл повторить запрос
+TRANSIENT_GEMINI_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.TooManyRequests,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+# Размер пачки при архивировании истории чата
+ARCHIVE_BATCH_SIZE = 1000
+DELETE_CHUNK_SIZE = 200
+COMPACT_LEASE_NAME = "ai_chat_history_compact"
+
+
+class AIUnavailableError(Exception):
+    """AI временно недоступен: очередь переполнена или открыт circuit breaker."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 
 class AIService:
     @staticmethod
@@ -29,7 +77,7 @@ class AIService:
             db.table('ai_keys').insert(new_key_data).execute()
             return key
         except Exception as e:
-            print(f"Ошибка при создании ключа в БД: {e}")
+            logger.error("Ошибка при создании ключа в БД: %s", e)
             return None
 
     @staticmethod
@@ -63,7 +111,7 @@ class AIService:
                 "last_usage_date": today.isoformat()
             }).eq('key', key).execute()
         except Exception as e:
-            print(f"Ошибка при обновлении использования ключа: {e}")
+            logger.error("Ошибка при обновлении использования ключа: %s", e)
             # Не блокируем доступ, если не удалось обновить, но логируем
         
         return True
@@ -74,7 +122,7 @@ class AIService:
             response = db.table('ai_keys').select("*").eq('generated_by', admin_username).execute()
             return response.data
         except Exception as e:
-            print(f"Ошибка при получении ключей для админа: {e}")
+            logger.error("Ошибка при получении ключей для админа: %s", e)
             return []
 
     @staticmethod
@@ -83,7 +131,7 @@ class AIService:
             db.table('ai_keys').update({"is_active": False}).eq('key', key).execute()
             return True
         except Exception as e:
-            print(f"Ошибка при деактивации ключа: {e}")
+            logger.error("Ошибка при деактивации ключа: %s", e)
             return False
 
     @staticmethod
@@ -96,32 +144,287 @@ class AIService:
                 "content": content
             }).execute()
         except Exception as e:
-            print(f"Ошибка при сохранении сообщения в чат: {e}")
+            logger.error("Ошибка при сохранении сообщения в чат: %s", e)
 
     @staticmethod
     def get_chat_history(db: Client, username: str) -> List[Dict[str, Any]]:
-        """Получает и форматирует историю чата для Gemini."""
+        """Получает и форматирует историю чата для Gemini (последние сообщения из горячего окна)."""
         try:
-            response = db.table('ai_chat_history').select("role, content").eq('username', username).order('created_at', desc=False).limit(20).execute()
-            
+            response = (
+                db.table('ai_chat_history')
+                .select("role, content")
+                .eq('username', username)
+                .order('created_at', desc=True)
+                .limit(settings.AI_HISTORY_CONTEXT_MESSAGES)
+                .execute()
+            )
+
             history = []
-            for item in response.data:
+            for item in reversed(response.data):
                 history.append({
                     "role": item['role'],
                     "parts": [item['content']]
                 })
             return history
         except Exception as e:
-            print(f"Ошибка при получении истории чата: {e}")
+            logger.error("Ошибка при получении истории чата: %s", e)
             return []
         
     @staticmethod
-    def get_gemini_response(prompt: str, history: list) -> str:
+    def get_chat_page(db: Client, username: str, before: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+        """Страница истории чата (от новых к старым) из горячей таблицы по индексу (username, created_at)."""
+        query = db.table('ai_chat_history').select("role, content, created_at").eq('username', username)
+        if before:
+            query = query.lt('created_at', before)
+        response = query.order('created_at', desc=True).limit(limit + 1).execute()
+        messages = response.data or []
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        return {
+            "messages": messages,
+            "next_before": messages[-1]['created_at'] if has_more and messages else None,
+        }
+
+    @staticmethod
+    def _archive_rows(db: Client, rows: List[Dict[str, Any]]) -> int:
+        """Сжимает сообщения в архивные строки по пользователям и удаляет их из горячей таблицы.
+
+        Возвращает число реально удалённых строк.
+        """
+        by_user: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            by_user[row['username']].append(row)
+
+        archive_rows = []
+        for username, messages in by_user.items():
+            messages.sort(key=lambda m: m['created_at'])
+            payload = json.dumps(
+                [{"role": m['role'], "content": m['content'], "created_at": m['created_at']} for m in messages],
+                ensure_ascii=False,
+            ).encode("utf-8")
+            archive_rows.append({
+                "username": username,
+                "from_ts": messages[0]['created_at'],
+                "to_ts": messages[-1]['created_at'],
+                "message_count": len(messages),
+                "payload": base64.b64encode(zlib.compress(payload, 9)).decode("ascii"),
+            })
+
+        # Сначала архив одним запросом, потом массовое удаление: при сбое между ними
+        # сообщения продублируются в архиве, но не потеряются
+        db.table('ai_chat_archive').insert(archive_rows).execute()
+        ids = [row['id'] for row in rows]
+        deleted = 0
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            response = db.table('ai_chat_history').delete().in_('id', ids[start:start + DELETE_CHUNK_SIZE]).execute()
+            deleted += len(response.data or [])
+        return deleted
+
+    @staticmethod
+    def compact_chat_history(db: Client) -> int:
+        """Пакетно архивирует сообщения старше AI_HISTORY_MAX_AGE_DAYS и сверх AI_HISTORY_MAX_MESSAGES на пользователя."""
+        holder = secrets.token_hex(8)
+        lease = {"p_name": COMPACT_LEASE_NAME, "p_holder": holder}
+        try:
+            acquired = db.rpc('try_acquire_job_lease', {
+                **lease, "p_ttl_seconds": settings.AI_HISTORY_COMPACT_LEASE_SECONDS,
+            }).execute().data
+        except Exception as e:
+            logger.error("Не удалось взять аренду архивирования истории чата: %s", e)
+            return 0
+        if not acquired:
+            logger.info("Архивирование истории чата уже идёт в другом воркере")
+            return 0
+
+        archived = 0
+        cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=settings.AI_HISTORY_MAX_AGE_DAYS)).isoformat()
+        try:
+            while True:
+                rows = (
+                    db.table('ai_chat_history')
+                    .select("id, username, role, content, created_at")
+                    .lt('created_at', cutoff)
+                    .order('created_at', desc=False)
+                    .limit(ARCHIVE_BATCH_SIZE)
+                    .execute()
+                ).data or []
+                if not rows:
+                    break
+                deleted = AIService._archive_rows(db, rows)
+                archived += deleted
+                # Часть строк удалил кто-то другой (например, после истечения аренды) — не соревнуемся
+                if deleted < len(rows):
+                    break
+
+            while True:
+                rows = db.rpc('ai_chat_history_overflow', {
+                    "p_cap": settings.AI_HISTORY_MAX_MESSAGES,
+                    "p_limit": ARCHIVE_BATCH_SIZE,
+                }).execute().data or []
+                if not rows:
+                    break
+                deleted = AIService._archive_rows(db, rows)
+                archived += deleted
+                if deleted < len(rows):
+                    break
+        except Exception as e:
+            logger.error("Ошибка при архивировании истории чата: %s", e)
+        finally:
+            try:
+                db.rpc('release_job_lease', lease).execute()
+            except Exception as e:
+                logger.error("Не удалось освободить аренду архивирования истории чата: %s", e)
+        return archived
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        # Для кириллицы в среднем около трёх символов на токен
+        return len(text) // 3 + 1
+
+    @staticmethod
+    def _split_stanzas(text: str) -> List[str]:
+        stanzas = [s.strip() for s in text.split('\n\n') if s.strip()]
+        if len(stanzas) > 1:
+            return stanzas
+        lines = [line for line in text.split('\n') if line.strip()]
+        return ['\n'.join(lines[i:i + 4]) for i in range(0, len(lines), 4)]
+
+    @staticmethod
+    def _stem_set(text: str) -> set:
+        return {word[:5] for word in PoemService.normalize_text(text).split() if len(word) > 3}
+
+    @staticmethod
+    def retrieve_context(db: Client, prompt: str, poem_title: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Подбирает из каталога стихи и строфы, относящиеся к вопросу, в пределах бюджета токенов."""
+        catalog = {p['title']: p for p in CatalogService.get_catalog(db).poems}
+
+        titles = []
+        if poem_title and poem_title in catalog:
+            titles.append(poem_title)
+        normalized_prompt = PoemService.normalize_text(prompt)
+        for hit in SimilarityService.search(db, prompt, settings.AI_CONTEXT_MAX_POEMS):
+            # Индекс похожести и снимок каталога обновляются независимо: стих может быть только в одном из них
+            if hit['score'] >= settings.AI_CONTEXT_MIN_SCORE and hit['title'] in catalog and hit['title'] not in titles:
+                titles.append(hit['title'])
+        # Стих, названный в вопросе прямо, важнее похожих по тексту
+        for title in catalog:
+            if len(titles) >= settings.AI_CONTEXT_MAX_POEMS + 1:
+                break
+            normalized_title = PoemService.normalize_text(title)
+            if len(normalized_title) > 3 and normalized_title in normalized_prompt and title not in titles:
+                titles.insert(1 if poem_title in titles else 0, title)
+        titles = titles[:settings.AI_CONTEXT_MAX_POEMS]
+
+        prompt_stems = AIService._stem_set(prompt)
+        budget = settings.AI_CONTEXT_TOKEN_BUDGET
+        context = []
+        for title in titles:
+            poem = catalog[title]
+            stanzas = AIService._split_stanzas(poem.get('text', ''))
+            # Строфы с наибольшим пересечением с вопросом — первыми, при равенстве — по порядку в стихе
+            ranked = sorted(
+                range(len(stanzas)),
+                key=lambda i: (-len(prompt_stems & AIService._stem_set(stanzas[i])), i),
+            )
+            chosen = []
+            for i in ranked:
+                cost = AIService._estimate_tokens(stanzas[i])
+                if cost > budget:
+                    continue
+                chosen.append(i)
+                budget -= cost
+            if chosen:
+                context.append({
+                    "title": title,
+                    "author": poem.get('author', ''),
+                    "stanzas": [stanzas[i] for i in sorted(chosen)],
+                    "complete": len(chosen) == len(stanzas),
+                })
+            if budget <= 0:
+                break
+        return context
+
+    @staticmethod
+    def build_grounded_prompt(db: Client, prompt: str, poem_title: Optional[str] = None) -> str:
+        """Дополняет вопрос найденными в каталоге строфами; без совпадений возвращает его как есть."""
         try:
+            context = AIService.retrieve_context(db, prompt, poem_title)
+        except Exception as e:
+            logger.error("Ошибка при подборе контекста из каталога: %s", e)
+            return prompt
+        if not context:
+            return prompt
+
+        parts = ["Фрагменты стихов из нашего сборника. Опирайся на них в ответе и не выдумывай строки, которых здесь нет."]
+        for item in context:
+            suffix = "" if item["complete"] else " (фрагменты)"
+            parts.append(f"«{item['title']}» — {item['author']}{suffix}:\n" + "\n...\n".join(item["stanzas"]))
+        parts.append(f"Вопрос: {prompt}")
+        return "\n\n".join(parts)
+
+    @staticmethod
+    def get_gemini_response(prompt: str, history: list, timings: Optional[Dict[str, float]] = None) -> str:
+        """Запрашивает ответ у Gemini с ограничением параллелизма, дедлайном и повторами.
+
+        Если передан `timings`, в него записываются отдельно время ожидания
+        слота (`queue_ms`) и суммарное время обращений к upstream (`upstream_ms`).
+        """
+        if timings is None:
+            timings = {}
+        timings.setdefault("queue_ms", 0.0)
+        timings.setdefault("upstream_ms", 0.0)
+
+        # Пока upstream нездоров, отказываем сразу, не занимая очередь
+        if gemini_breaker.state == CircuitBreaker.OPEN:
+            raise AIUnavailableError("AI временно недоступен, попробуйте позже.", gemini_breaker.retry_after())
+
+        queued_at = time.monotonic()
+        acquired = _gemini_slots.acquire(timeout=settings.AI_QUEUE_TIMEOUT_SECONDS)
+        timings["queue_ms"] = (time.monotonic() - queued_at) * 1000
+        if not acquired:
+            raise AIUnavailableError("Слишком много запросов к AI, попробуйте позже.", settings.AI_QUEUE_TIMEOUT_SECONDS)
+
+        if not gemini_breaker.allow_request():
+            _gemini_slots.release()
+            raise AIUnavailableError("AI временно недоступен, попробуйте позже.", gemini_breaker.retry_after())
+
+        try:
+            deadline = time.monotonic() + settings.AI_TOTAL_DEADLINE_SECONDS
             model = genai.GenerativeModel('gemini-3-flash-preview')
             chat = model.start_chat(history=history)
-            response = chat.send_message(prompt)
-            return response.text
+
+            for attempt in range(settings.AI_MAX_RETRIES + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                started_at = time.monotonic()
+                try:
+                    response = chat.send_message(
+                        prompt,
+                        request_options={"timeout": min(settings.AI_CALL_TIMEOUT_SECONDS, remaining)},
+                    )
+                    timings["upstream_ms"] += (time.monotonic() - started_at) * 1000
+                    # response.text бросает ValueError для заблокированного ответа — это не сбой upstream
+                    text = response.text
+                    gemini_breaker.record_success()
+                    return text
+                except TRANSIENT_GEMINI_ERRORS as e:
+                    timings["upstream_ms"] += (time.monotonic() - started_at) * 1000
+                    logger.warning("Временная ошибка Gemini API (попытка %d): %s", attempt + 1, e)
+                    if attempt == settings.AI_MAX_RETRIES:
+                        break
+                    # Экспоненциальная задержка с полным джиттером, не выходя за дедлайн
+                    backoff = random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+                    time.sleep(max(0.0, min(backoff, deadline - time.monotonic())))
+
+            gemini_breaker.record_failure()
+            return "Извините, произошла ошибка при обращении к AI."
         except Exception as e:
-            print(f"Ошибка при вызове Gemini API: {e}")
+            # InvalidArgument, PermissionDenied, заблокированный ответ и т.п. вызваны самим
+            # запросом: открывать breaker для всех пользователей из-за них нельзя
+            gemini_breaker.record_ignored()
+            logger.error("Ошибка при вызове Gemini API: %s", e)
             return "Извините, произошла ошибка при обращении к AI."
+        finally:
+            _gemini_slots.release()
+            logger.debug("Gemini: ожидание слота %.0f мс, upstream %.0f мс", timings['queue_ms'], timings['upstream_ms'])
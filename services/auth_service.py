@@ -1,3 +1,4 @@
+import logging
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
@@ -5,6 +6,8 @@ from passlib.context import CryptContext
 from supabase import Client
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # In-memory storage for virtual admins
@@ -30,7 +33,7 @@ class AuthService:
             safe_password = plain_password[:72] if plain_password else ""
             return pwd_context.verify(safe_password, hashed_password)
         except Exception as e:
-            print(f"Ошибка при проверке пароля: {e}")
+            logger.error("Ошибка при проверке пароля: %s", e)
             return False
 
     @staticmethod
@@ -70,6 +73,19 @@ class AuthService:
         virtual_admin_read_poems[username] = reads
         return action
         
+    @staticmethod
+    def set_virtual_admin_read_status(username: str, titles: List[str], read: bool) -> List[str]:
+        """Массово отмечает или снимает отметку о прочтении для виртуального админа."""
+        reads = virtual_admin_read_poems.setdefault(username, [])
+        if read:
+            changed = [title for title in titles if title not in reads]
+            reads.extend(changed)
+        else:
+            changed = [title for title in titles if title in reads]
+            removed = set(changed)
+            reads[:] = [title for title in reads if title not in removed]
+        return changed
+
     @staticmethod
     def toggle_virtual_admin_pinned_poem(username: str, title: str) -> tuple[str, str]:
         """Переключает статус изучаемого стиха для виртуального админа."""
@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import closing
+from typing import Optional, Dict, Any, List
+from supabase import Client
+
+from core.config import settings
+from core.pubsub import poem_events
+from core.serialization import SerializedPayload
+from services.changelog_service import ChangeLogService
+from services.similarity_service import SimilarityService
+from services.duplicate_service import DuplicateService
+from services.progress_service import ProgressService
+from services.poem_service import PoemService
+
+logger = logging.getLogger(__name__)
+
+# Локальная копия каталога: с неё воркер стартует без Supabase и на ней живёт при сбоях
+_SNAPSHOT_PATH = os.path.join(settings.INDEX_DIR, "catalog.sqlite3")
+
+
+class CatalogSnapshot:
+    """Каталог одной версии вместе с заранее сериализованными ответами."""
+
+    def __init__(self, version: int, poems: List[Dict[str, Any]], fetched_at: Optional[float] = None):
+        self.version = version
+        self.poems = poems
+        self.loaded_at = time.monotonic()
+        # Когда Supabase последний раз подтвердил эту версию (unix time)
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.expired = False
+        self.poems_payload = SerializedPayload(poems)
+        self.api_payload = SerializedPayload({"success": True, "poems": poems})
+
+    @property
+    def stale_age(self) -> int:
+        return max(0, int(time.time() - self.fetched_at))
+
+
+_catalog: Optional[CatalogSnapshot] = None
+_catalog_lock = threading.Lock()
+# Проверка версии и перечитывание каталога идут в одном фоновом потоке,
+# чтобы запрос мог не дожидаться зависшего upstream
+_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-refresh")
+_refresh_future: Optional[Future] = None
+_upstream_failed_at = float("-inf")
+
+
+class CatalogService:
+    """Точка, через которую изменения каталога доходят до производных индексов."""
+
+    @staticmethod
+    def _save_snapshot(snapshot: CatalogSnapshot):
+        """Сохраняет каталог в SQLite; более старая версия не перезаписывает более новую."""
+        try:
+            os.makedirs(settings.INDEX_DIR, exist_ok=True)
+            with closing(sqlite3.connect(_SNAPSHOT_PATH, timeout=5)) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS catalog_snapshot ("
+                    "id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL, "
+                    "fetched_at REAL NOT NULL, poems BLOB NOT NULL)"
+                )
+                conn.execute(
+                    "INSERT INTO catalog_snapshot (id, version, fetched_at, poems) VALUES (1, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET version = excluded.version, "
+                    "fetched_at = excluded.fetched_at, poems = excluded.poems "
+                    "WHERE excluded.version >= catalog_snapshot.version",
+                    (snapshot.version, snapshot.fetched_at, snapshot.poems_payload.json),
+                )
+        except (OSError, sqlite3.Error) as e:
+            logger.error("Ошибка при сохранении снимка каталога: %s", e)
+
+    @staticmethod
+    def _load_snapshot() -> Optional[CatalogSnapshot]:
+        if not os.path.exists(_SNAPSHOT_PATH):
+            return None
+        try:
+            with closing(sqlite3.connect(f"file:{_SNAPSHOT_PATH}?mode=ro", uri=True, timeout=5)) as conn:
+                row = conn.execute("SELECT version, fetched_at, poems FROM catalog_snapshot WHERE id = 1").fetchone()
+        except sqlite3.Error as e:
+            logger.error("Ошибка при чтении снимка каталога: %s", e)
+            return None
+        if row is None:
+            return None
+        version, fetched_at, poems = row
+        return CatalogSnapshot(version, json.loads(poems), fetched_at=fetched_at)
+
+    @staticmethod
+    def _refresh(db: Client) -> CatalogSnapshot:
+        """Сверяет версию с журналом изменений и перечитывает каталог, если она сменилась."""
+        global _catalog, _upstream_failed_at
+        cached = _catalog
+        try:
+            version = ChangeLogService.latest_version(db)
+            if (
+                cached is not None
+                and not cached.expired
+                and cached.version == version
+                and time.monotonic() - cached.loaded_at < settings.CATALOG_CACHE_TTL_SECONDS
+            ):
+                cached.fetched_at = time.time()
+                return cached
+            poems = PoemService.process_poems_data(db.table('poem').select("*").execute().data or [])
+        except Exception:
+            _upstream_failed_at = time.monotonic()
+            raise
+
+        snapshot = CatalogSnapshot(version, poems)
+        with _catalog_lock:
+            _catalog = snapshot
+        if cached is None or cached.expired or cached.version != version:
+            CatalogService._save_snapshot(snapshot)
+        return snapshot
+
+    @staticmethod
+    def _start_refresh(db: Client) -> Future:
+        global _refresh_future
+        with _catalog_lock:
+            if _refresh_future is None or _refresh_future.done():
+                _refresh_future = _refresh_executor.submit(CatalogService._refresh, db)
+            return _refresh_future
+
+    @staticmethod
+    def warm_start(db: Client):
+        """При старте воркера поднимает каталог с диска и сверяет его с Supabase в фоне."""
+        global _catalog
+        snapshot = CatalogService._load_snapshot()
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = snapshot
+        CatalogService._start_refresh(db)
+
+    @staticmethod
+    def get_catalog(db: Client) -> CatalogSnapshot:
+        """Возвращает каталог по схеме stale-while-revalidate.
+
+        Версия сверяется с журналом изменений не дольше CATALOG_UPSTREAM_TIMEOUT_SECONDS;
+        если Supabase не ответил или ответил ошибкой, отдаётся последний известный
+        каталог (из памяти или с диска), а проверка завершится в фоне.
+        """
+        global _catalog
+        cached = _catalog
+        if cached is None:
+            snapshot = CatalogService._load_snapshot()
+            with _catalog_lock:
+                if _catalog is None:
+                    _catalog = snapshot
+                cached = _catalog
+
+        if cached is None:
+            # Холодный старт без снимка: отдать нечего, ждём Supabase
+            return CatalogService._start_refresh(db).result()
+
+        if time.monotonic() - _upstream_failed_at < settings.CATALOG_UPSTREAM_RETRY_SECONDS:
+            return cached
+        if _refresh_future is not None and not _refresh_future.done():
+            # Проверку уже ведёт другой запрос — не ждём её второй раз
+            return cached
+
+        try:
+            return CatalogService._start_refresh(db).result(timeout=settings.CATALOG_UPSTREAM_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            logger.warning("Supabase не ответил за %.1f с, каталог отдаётся из снимка", settings.CATALOG_UPSTREAM_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning("Ошибка при обновлении каталога, каталог отдаётся из снимка: %s", e)
+        return cached
+
+    @staticmethod
+    def stale_headers(catalog: CatalogSnapshot) -> Dict[str, str]:
+        """Заголовок с возрастом каталога, если он не подтверждён Supabase прямо сейчас."""
+        age = catalog.stale_age
+        return {"X-Catalog-Stale-Age": str(age)} if age >= 1 else {}
+
+    @staticmethod
+    def invalidate(db: Optional[Client] = None):
+        """Помечает каталог устаревшим; с db сразу перечитывает его в фоне.
+
+        Старый каталог остаётся в памяти, чтобы было что отдать, если Supabase недоступен.
+        """
+        cached = _catalog
+        if cached is not None:
+            cached.expired = True
+        if db is not None:
+            CatalogService._start_refresh(db)
+
+    @staticmethod
+    def on_poem_saved(db: Client, poem: Dict[str, Any], old_title: Optional[str] = None,
+                      old_author: Optional[str] = None, version: Optional[int] = None, changes: int = 1):
+        """Вызывается после добавления (old_title=None) или редактирования стиха.
+
+        old_author — автор до правки, version и changes — последняя версия журнала
+        и число занятых правкой версий; всё это возвращает БД вместе со строкой.
+        """
+        ChangeLogService.after_write(db, version, changes)
+        CatalogService.invalidate(db)
+
+        try:
+            SimilarityService.upsert_poem(db, poem, old_title, version, changes)
+            DuplicateService.upsert_poem(db, poem, old_title, version, changes)
+            ProgressService.on_poem_saved(db, poem, old_title, old_author)
+        except Exception:
+            logger.exception("Ошибка при обновлении индексов каталога")
+
+        poem_events.publish({
+            "type": "added" if old_title is None else "updated",
+            "old_title": old_title,
+            "poem": poem,
+            "version": version,
+            # Сколько версий журнала занимает событие: переименование — удаление и upsert
+            "changes": changes,
+        })
+
+    @staticmethod
+    def on_poem_deleted(db: Client, title: str, author: Optional[str] = None, version: Optional[int] = None):
+        ChangeLogService.after_write(db, version, 1)
+        CatalogService.invalidate(db)
+
+        try:
+            SimilarityService.remove_poem(db, title, version)
+            DuplicateService.remove_poem(db, title, version)
+            ProgressService.on_poem_deleted(db, title, author)
+        except Exception:
+            logger.exception("Ошибка при обновлении индексов каталога")
+
+        poem_events.publish({"type": "deleted", "title": title, "version": version, "changes": 1})
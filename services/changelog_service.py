@@ -0,0 +1,101 @@
+import datetime
+import logging
+from typing import Optional, List, Dict, Any
+from supabase import Client
+
+from core.config import settings
+from services.poem_service import PoemService
+
+logger = logging.getLogger(__name__)
+
+# Больше изменений, чем это, дешевле отдать снимком
+MAX_DELTA_CHANGES = 1000
+
+
+class ChangeLogService:
+    @staticmethod
+    def after_write(db: Client, version: Optional[int], changes: int):
+        """Вызывается после правки каталога с версией, которую вернула БД.
+
+        Сами записи журнала делает триггер poem_log_change в транзакции правки,
+        здесь только периодическое сжатие.
+        """
+        if version is None:
+            return
+        if any(v % settings.POEM_CHANGES_COMPACT_EVERY == 0 for v in range(version - changes + 1, version + 1)):
+            ChangeLogService.compact(db, version)
+
+    @staticmethod
+    def compact(db: Client, latest_version: int):
+        """Удаляет старые записи, оставляя последние POEM_CHANGES_RETAIN версий."""
+        cutoff = latest_version - settings.POEM_CHANGES_RETAIN
+        if cutoff <= 0:
+            return
+        try:
+            db.table('poem_changes').delete().lte('version', cutoff).execute()
+        except Exception as e:
+            logger.error("Ошибка при сжатии журнала изменений: %s", e)
+
+    @staticmethod
+    def latest_version(db: Client) -> int:
+        response = db.table('poem_changes').select('version').order('version', desc=True).limit(1).execute()
+        return response.data[0]['version'] if response.data else 0
+
+    @staticmethod
+    def snapshot(db: Client) -> Dict[str, Any]:
+        # Версию читаем до каталога: изменения между запросами клиент получит повторно, а не потеряет
+        version = ChangeLogService.latest_version(db)
+        poems = db.table('poem').select("*").execute().data or []
+        return {"full": True, "version": version, "poems": PoemService.process_poems_data(poems)}
+
+    @staticmethod
+    def _committed_prefix(changes: List[Dict[str, Any]], since: int) -> List[Dict[str, Any]]:
+        """Отрезает изменения после свежего пропуска в версиях.
+
+        Identity раздаёт версии до коммита, поэтому версия N+1 может стать видна
+        раньше N. Отдав её, клиент сдвинулся бы за N и никогда её не получил.
+        Старый пропуск — откат транзакции, его просто пропускаем.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        expected = since + 1
+        for i, change in enumerate(changes):
+            if change['version'] != expected:
+                created_at = datetime.datetime.fromisoformat(change['created_at'])
+                if (now - created_at).total_seconds() < settings.POEM_CHANGES_GAP_GRACE_SECONDS:
+                    return changes[:i]
+            expected = change['version'] + 1
+        return changes
+
+    @staticmethod
+    def changes_since(db: Client, since: int) -> Dict[str, Any]:
+        """Upsert'ы и tombstone'ы после версии `since` или полный снимок, если дельту не собрать."""
+        if since <= 0:
+            return ChangeLogService.snapshot(db)
+
+        oldest = db.table('poem_changes').select('version').order('version', desc=False).limit(1).execute()
+        # Журнал сжат дальше версии клиента (или пуст) — отдаём снимок
+        if not oldest.data or oldest.data[0]['version'] - 1 > since:
+            return ChangeLogService.snapshot(db)
+
+        response = (
+            db.table('poem_changes')
+            .select('version, op, title, poem, created_at')
+            .gt('version', since)
+            .order('version', desc=False)
+            .limit(MAX_DELTA_CHANGES + 1)
+            .execute()
+        )
+        changes = response.data or []
+        if len(changes) > MAX_DELTA_CHANGES:
+            return ChangeLogService.snapshot(db)
+        changes = ChangeLogService._committed_prefix(changes, since)
+
+        # Для каждого названия важна только последняя операция
+        latest: Dict[str, Dict[str, Any]] = {}
+        for change in changes:
+            latest[change['title']] = change
+
+        upserts = [PoemService.process_poem_data(dict(c['poem'])) for c in latest.values() if c['op'] == 'upsert' and c.get('poem')]
+        deletes = [title for title, c in latest.items() if c['op'] == 'delete']
+        version = changes[-1]['version'] if changes else since
+        return {"full": False, "version": version, "upserts": upserts, "deletes": deletes}
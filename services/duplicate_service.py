@@ -0,0 +1,196 @@
+import logging
+import threading
+import zlib
+from collections import defaultdict
+from typing import Optional, List, Dict, Any, Set, Tuple
+
+import numpy as np
+from supabase import Client
+
+from services.changelog_service import ChangeLogService
+from services.poem_service import PoemService
+
+logger = logging.getLogger(__name__)
+
+# 128 перестановок, 16 полос по 8 строк: пары с Jaccard около 0.7 и выше
+# почти наверняка попадают в общую корзину хотя бы одной полосы
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+
+_PRIME = np.uint64((1 << 32) + 15)
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+
+
+def _shingles(text: str) -> np.ndarray:
+    words = PoemService.normalize_text(text).split()
+    if len(words) < SHINGLE_SIZE:
+        grams = {' '.join(words)} if words else set()
+    else:
+        grams = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash-подпись текста: минимум (a*x + b) mod p по всем шинглам для каждой перестановки."""
+    hashes = _shingles(text)
+    if not len(hashes):
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _PRIME).min(axis=0)
+
+
+def _band_keys(signature: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+def _similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Оценка сходства Жаккара по доле совпавших позиций подписи."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+class _LSHIndex:
+    def __init__(self, catalog_version: int = 0):
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.buckets: Dict[Tuple[int, bytes], Set[str]] = defaultdict(set)
+        # Версия журнала изменений, по которой построен индекс
+        self.catalog_version = catalog_version
+
+    def add(self, title: str, signature: np.ndarray):
+        self.remove(title)
+        self.signatures[title] = signature
+        for key in _band_keys(signature):
+            self.buckets[key].add(title)
+
+    def remove(self, title: str):
+        signature = self.signatures.pop(title, None)
+        if signature is None:
+            return
+        for key in _band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(title)
+                if not bucket:
+                    del self.buckets[key]
+
+    def query(self, signature: np.ndarray, exclude: Set[str]) -> List[Dict[str, Any]]:
+        candidates = set()
+        for key in _band_keys(signature):
+            candidates |= self.buckets.get(key, set())
+        candidates -= exclude
+
+        matches = []
+        for title in candidates:
+            score = _similarity(signature, self.signatures[title])
+            if score >= DUPLICATE_THRESHOLD:
+                matches.append({"title": title, "similarity": round(score, 3)})
+        return sorted(matches, key=lambda m: -m["similarity"])
+
+
+_index: Optional[_LSHIndex] = None
+_index_lock = threading.Lock()
+
+
+class DuplicateService:
+    @staticmethod
+    def _get_index(db: Client, verify: bool = True) -> _LSHIndex:
+        """Индекс воркера; с verify=True пересобирается, если журнал изменений ушёл вперёд.
+
+        Правки, сделанные в других воркерах и инстансах, приходят сюда только так:
+        хуки CatalogService обновляют индекс лишь того процесса, где прошла запись.
+        """
+        global _index
+        latest = ChangeLogService.latest_version(db) if verify or _index is None else None
+        if _index is None or (latest is not None and latest != _index.catalog_version):
+            with _index_lock:
+                if _index is None or (latest is not None and latest != _index.catalog_version):
+                    poems = db.table('poem').select('title, text').execute().data or []
+                    index = _LSHIndex(latest or 0)
+                    for poem in poems:
+                        index.add(poem['title'], minhash(poem.get('text', '')))
+                    _index = index
+        return _index
+
+    @staticmethod
+    def find_duplicates(db: Client, text: str, exclude_titles: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Ищет почти-дубликаты текста через LSH-корзины, не сравнивая со всем каталогом."""
+        try:
+            index = DuplicateService._get_index(db)
+        except Exception as e:
+            logger.error("Ошибка при построении индекса дубликатов: %s", e)
+            return []
+        return index.query(minhash(text), set(exclude_titles or []))
+
+    @staticmethod
+    def _advance(index: _LSHIndex, version: Optional[int], changes: int):
+        """Сдвигает версию индекса на записанные изменения, если между ними нет чужих.
+
+        При пропуске версия остаётся старой, и следующий _get_index пересоберёт индекс.
+        """
+        if version is not None and version == index.catalog_version + changes:
+            index.catalog_version = version
+
+    @staticmethod
+    def upsert_poem(db: Client, poem: Dict[str, Any], old_title: Optional[str] = None,
+                    version: Optional[int] = None, changes: int = 1):
+        """version — последняя версия журнала после записи, changes — сколько версий она заняла."""
+        index = DuplicateService._get_index(db, verify=False)
+        with _index_lock:
+            if old_title:
+                index.remove(old_title)
+            index.add(poem['title'], minhash(poem.get('text', '')))
+            DuplicateService._advance(index, version, changes)
+
+    @staticmethod
+    def remove_poem(db: Client, title: str, version: Optional[int] = None):
+        index = DuplicateService._get_index(db, verify=False)
+        with _index_lock:
+            index.remove(title)
+            DuplicateService._advance(index, version, 1)
+
+    @staticmethod
+    def duplicate_clusters(poems: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Находит группы дубликатов во всём каталоге за один проход по корзинам LSH."""
+        signatures = {p['title']: minhash(p.get('text', '')) for p in poems}
+        buckets: Dict[Tuple[int, bytes], List[str]] = defaultdict(list)
+        for title, signature in signatures.items():
+            for key in _band_keys(signature):
+                buckets[key].append(title)
+
+        parent = {title: title for title in signatures}
+
+        def find(x: str) -> str:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        best_score: Dict[str, float] = {}
+        checked = set()
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    pair = (a, b) if a < b else (b, a)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    score = _similarity(signatures[a], signatures[b])
+                    if score >= DUPLICATE_THRESHOLD:
+                        root_a, root_b = find(a), find(b)
+                        if root_a != root_b:
+                            parent[root_b] = root_a
+                        best_score[a] = max(best_score.get(a, 0.0), score)
+                        best_score[b] = max(best_score.get(b, 0.0), score)
+
+        clusters: Dict[str, List[str]] = defaultdict(list)
+        for title in best_score:
+            clusters[find(title)].append(title)
+        return [
+            {"titles": sorted(titles), "similarity": round(max(best_score[t] for t in titles), 3)}
+            for titles in clusters.values()
+        ]
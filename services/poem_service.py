@@ -1,3 +1,8 @@
+import re
+
+_non_word_re = re.compile(r"[^\w]+", re.UNICODE)
+
+
 class PoemService:
     @staticmethod
     def process_poem_data(poem: dict) -> dict:
@@ -10,3 +15,9 @@ class PoemService:
     def process_poems_data(poems: list) -> list:
         """Обрабатывает список стихов."""
         return [PoemService.process_poem_data(poem) for poem in poems]
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Нормализует русский текст для индексации: регистр, «ё», пунктуация, пробелы."""
+        text = (text or '').replace('\\n', '\n').lower().replace('ё', 'е')
+        return ' '.join(_non_word_re.sub(' ', text).replace('_', ' ').split())
@@ -0,0 +1,183 @@
+import datetime
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Optional, List, Dict, Any
+
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Агрегаты каталога живут в памяти воркера и обновляются через CatalogService;
+# периодическая пересборка ограничивает расхождение с правками из других воркеров
+CATALOG_STATS_TTL_SECONDS = 600
+
+_catalog_authors: Optional[Dict[str, str]] = None
+_author_totals: Counter = Counter()
+_catalog_built_at = 0.0
+_catalog_lock = threading.Lock()
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {
+        "read_count": 0,
+        "authors": {},
+        "current_streak": 0,
+        "longest_streak": 0,
+        "last_read_date": None,
+    }
+
+
+class ProgressService:
+    @staticmethod
+    def _catalog(db: Client) -> Dict[str, str]:
+        """Возвращает отображение «название → автор» для всего каталога."""
+        global _catalog_authors, _author_totals, _catalog_built_at
+        if _catalog_authors is None or time.monotonic() - _catalog_built_at > CATALOG_STATS_TTL_SECONDS:
+            with _catalog_lock:
+                poems = db.table('poem').select('title, author').execute().data or []
+                _catalog_authors = {p['title']: p.get('author', '') for p in poems}
+                _author_totals = Counter(_catalog_authors.values())
+                _catalog_built_at = time.monotonic()
+        return _catalog_authors
+
+    @staticmethod
+    def compute_stats(db: Client, read_titles: List[str]) -> Dict[str, Any]:
+        """Полный пересчёт счётчиков по списку прочитанного — только для начального заполнения."""
+        catalog = ProgressService._catalog(db)
+        stats = _empty_stats()
+        authors = Counter(catalog[t] for t in set(read_titles) if t in catalog)
+        stats["read_count"] = sum(authors.values())
+        stats["authors"] = dict(authors)
+        return stats
+
+    @staticmethod
+    def ensure_stats(db: Client, user: Dict[str, Any], read_titles: List[str]) -> Dict[str, Any]:
+        """Возвращает сохранённые счётчики пользователя или считает их впервые."""
+        stats = user.get('progress_stats')
+        if isinstance(stats, dict) and "read_count" in stats:
+            return stats
+        return ProgressService.compute_stats(db, read_titles)
+
+    @staticmethod
+    def apply_toggle(stats: Dict[str, Any], author: Optional[str], action: str, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+        """Инкрементально обновляет счётчики после отметки/снятия отметки о прочтении."""
+        stats = {**_empty_stats(), **stats, "authors": dict(stats.get("authors") or {})}
+        author = author or ''
+        if action == 'marked':
+            stats["read_count"] += 1
+            stats["authors"][author] = stats["authors"].get(author, 0) + 1
+
+            today = today or datetime.date.today()
+            last = datetime.date.fromisoformat(stats["last_read_date"]) if stats.get("last_read_date") else None
+            if last != today:
+                stats["current_streak"] = stats["current_streak"] + 1 if last == today - datetime.timedelta(days=1) else 1
+                stats["last_read_date"] = today.isoformat()
+            stats["longest_streak"] = max(stats["longest_streak"], stats["current_streak"])
+        else:
+            stats["read_count"] = max(0, stats["read_count"] - 1)
+            remaining = stats["authors"].get(author, 0) - 1
+            if remaining > 0:
+                stats["authors"][author] = remaining
+            else:
+                stats["authors"].pop(author, None)
+        return stats
+
+    @staticmethod
+    def get_progress(db: Client, user: Dict[str, Any], read_titles: List[str], persist: bool = True) -> Dict[str, Any]:
+        """Готовые к отображению агрегаты: читаются из счётчиков, без разбора всего списка."""
+        stats = user.get('progress_stats')
+        if not (isinstance(stats, dict) and "read_count" in stats):
+            stats = ProgressService.compute_stats(db, read_titles)
+            if persist:
+                try:
+                    db.table('user').update({"progress_stats": stats}).eq('username', user['username']).execute()
+                    user['progress_stats'] = stats
+                except Exception as e:
+                    logger.error("Ошибка при сохранении статистики прогресса: %s", e)
+
+        ProgressService._catalog(db)
+        total = sum(_author_totals.values())
+        read_count = min(stats["read_count"], total)
+
+        current_streak = stats.get("current_streak", 0)
+        if stats.get("last_read_date"):
+            last = datetime.date.fromisoformat(stats["last_read_date"])
+            if (datetime.date.today() - last).days > 1:
+                current_streak = 0
+
+        authors = sorted(
+            (
+                {"author": author, "read": count, "total": _author_totals.get(author, count)}
+                for author, count in stats.get("authors", {}).items()
+            ),
+            key=lambda a: (-a["read"], a["author"]),
+        )
+        return {
+            "read_count": read_count,
+            "total": total,
+            "percent": round(100 * read_count / total) if total else 0,
+            "authors": authors,
+            "current_streak": current_streak,
+            "longest_streak": stats.get("longest_streak", 0),
+        }
+
+    @staticmethod
+    def _shift_readers(db: Client, title: str, old_author: Optional[str], new_author: Optional[str]):
+        """Переносит счётчик у всех, кто прочитал стих: убирает у old_author, добавляет new_author.
+
+        Все читатели обновляются одним запросом (функция shift_poem_readers в БД).
+        """
+        db.rpc('shift_poem_readers', {
+            "p_title": title,
+            "p_old_author": old_author,
+            "p_new_author": new_author,
+        }).execute()
+
+    @staticmethod
+    def _move_total(old_author: Optional[str], new_author: Optional[str], old_title: Optional[str] = None,
+                    title: Optional[str] = None):
+        """Поправляет агрегаты каталога воркера, если они уже построены.
+
+        Холодный или устаревший кеш не трогаем: следующий _catalog() перечитает
+        таблицу, где запись уже есть.
+        """
+        with _catalog_lock:
+            if _catalog_authors is None or time.monotonic() - _catalog_built_at > CATALOG_STATS_TTL_SECONDS:
+                return
+            if old_title is not None:
+                _catalog_authors.pop(old_title, None)
+            if old_author is not None:
+                _author_totals[old_author] -= 1
+                if _author_totals[old_author] <= 0:
+                    del _author_totals[old_author]
+            if title is not None:
+                _catalog_authors[title] = new_author
+            if new_author is not None:
+                _author_totals[new_author] += 1
+
+    @staticmethod
+    def on_poem_saved(db: Client, poem: Dict[str, Any], old_title: Optional[str] = None,
+                      old_author: Optional[str] = None):
+        """old_author — автор до записи из ответа БД (None для нового стиха)."""
+        title, author = poem['title'], poem.get('author', '')
+        renamed = bool(old_title) and old_title != title
+        ProgressService._move_total(old_author, author, old_title if renamed else None, title)
+
+        if renamed:
+            # Прочитанное хранится по названию: старое название выпадает из каталога, новое — появляется
+            ProgressService._shift_readers(db, old_title, old_author, None)
+            ProgressService._shift_readers(db, title, None, author)
+        elif old_author is None:
+            ProgressService._shift_readers(db, title, None, author)
+        elif old_author != author:
+            ProgressService._shift_readers(db, title, old_author, author)
+
+    @staticmethod
+    def on_poem_deleted(db: Client, title: str, author: Optional[str] = None):
+        """author — автор удалённой строки из ответа delete."""
+        if author is None:
+            return
+        ProgressService._move_total(author, None, title)
+        ProgressService._shift_readers(db, title, author, None)
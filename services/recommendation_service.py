@@ -0,0 +1,175 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from supabase import Client
+
+from core.config import settings
+from services.user_service import UserService
+
+logger = logging.getLogger(__name__)
+
+
+class _RecommendationIndex:
+    """Предрасчитанная item-item матрица сходства и top-k таблица по пользователям."""
+
+    def __init__(self, titles: List[str], authors: List[str], similarity: sp.csr_matrix, popularity: np.ndarray):
+        self.titles = titles
+        self.authors = authors
+        self.title_to_idx = {title: i for i, title in enumerate(titles)}
+        self.similarity = similarity
+        # Индексы стихов по убыванию числа читателей — запасной вариант для новых пользователей
+        self.popular_order = np.argsort(-popularity, kind="stable")
+        self.top_k: Dict[str, List[Tuple[str, str, float]]] = {}
+        self.built_at = time.monotonic()
+
+    def interactions(self, read_titles: List[str], pinned_title: Optional[str] = None) -> np.ndarray:
+        items = {self.title_to_idx[t] for t in read_titles if t in self.title_to_idx}
+        if pinned_title in self.title_to_idx:
+            items.add(self.title_to_idx[pinned_title])
+        return np.fromiter(items, dtype=np.int64, count=len(items))
+
+    def rank(self, scores: np.ndarray, exclude: np.ndarray, k: int) -> List[Tuple[str, str, float]]:
+        """Выбирает top-k по вектору оценок, исключая уже прочитанные стихи."""
+        scores = scores.astype(np.float64, copy=True)
+        scores[exclude] = -np.inf
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            part = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[part]
+        best = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        result = [(self.titles[i], self.authors[i], float(scores[i])) for i in best]
+        if len(result) < k:
+            # Добираем популярными стихами, которые пользователь ещё не читал
+            taken = set(best.tolist()) | set(exclude.tolist())
+            for i in self.popular_order:
+                if len(result) >= k:
+                    break
+                if i not in taken:
+                    result.append((self.titles[i], self.authors[i], 0.0))
+        return result
+
+    def recommend_for(self, read_titles: List[str], pinned_title: Optional[str], k: int) -> List[Tuple[str, str, float]]:
+        items = self.interactions(read_titles, pinned_title)
+        if len(items):
+            scores = np.asarray(self.similarity[items].sum(axis=0)).ravel()
+        else:
+            scores = np.zeros(len(self.titles))
+        return self.rank(scores, items, k)
+
+
+_index: Optional[_RecommendationIndex] = None
+_index_lock = threading.Lock()
+_refresh_in_progress = threading.Event()
+
+
+class RecommendationService:
+    @staticmethod
+    def build_index(db: Client) -> _RecommendationIndex:
+        """Строит разреженную матрицу пользователь–стих и item-item сходство по совместному чтению."""
+        poems = db.table('poem').select('title, author').execute().data or []
+        users = db.table('user').select('username, read_poems_json, pinned_poem_title').execute().data or []
+
+        titles = [p['title'] for p in poems]
+        authors = [p.get('author', '') for p in poems]
+        title_to_idx = {title: i for i, title in enumerate(titles)}
+
+        rows, cols = [], []
+        user_reads = []
+        for u, user in enumerate(users):
+            reads = UserService.parse_read_poems_json(user.get('read_poems_json'))
+            items = {title_to_idx[t] for t in reads if t in title_to_idx}
+            if user.get('pinned_poem_title') in title_to_idx:
+                items.add(title_to_idx[user['pinned_poem_title']])
+            rows.extend([u] * len(items))
+            cols.extend(items)
+            user_reads.append(np.fromiter(items, dtype=np.int64, count=len(items)))
+
+        n_users, n_poems = len(users), len(titles)
+        X = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n_users, n_poems),
+        )
+
+        # Совместная встречаемость и косинусная нормировка: C_ij / sqrt(C_ii * C_jj)
+        cooccurrence = (X.T @ X).tocsr()
+        popularity = cooccurrence.diagonal()
+        norms = np.sqrt(popularity)
+        norms[norms == 0] = 1.0
+        inv = sp.diags(1.0 / norms)
+        similarity = (inv @ cooccurrence @ inv).tocsr()
+        similarity.setdiag(0)
+        similarity.eliminate_zeros()
+
+        index = _RecommendationIndex(titles, authors, similarity, popularity)
+
+        # Оценки считаем блоками пользователей матричным произведением X @ S
+        k = settings.RECOMMENDATIONS_TOP_K
+        for start in range(0, n_users, 1024):
+            block = (X[start:start + 1024] @ similarity).toarray()
+            for offset, scores in enumerate(block):
+                u = start + offset
+                index.top_k[users[u]['username']] = index.rank(scores, user_reads[u], k)
+        return index
+
+    @staticmethod
+    def refresh(db: Client):
+        global _index
+        try:
+            new_index = RecommendationService.build_index(db)
+            with _index_lock:
+                _index = new_index
+        except Exception as e:
+            logger.error("Ошибка при построении индекса рекомендаций: %s", e)
+        finally:
+            _refresh_in_progress.clear()
+
+    @staticmethod
+    def _get_index(db: Client) -> Optional[_RecommendationIndex]:
+        if _index is None:
+            with _index_lock:
+                needs_build = _index is None
+            if needs_build:
+                _refresh_in_progress.set()
+                RecommendationService.refresh(db)
+        elif time.monotonic() - _index.built_at > settings.RECOMMENDATIONS_REFRESH_SECONDS:
+            # Устаревший индекс продолжаем отдавать, пока в фоне строится новый
+            if not _refresh_in_progress.is_set():
+                _refresh_in_progress.set()
+                threading.Thread(target=RecommendationService.refresh, args=(db,), daemon=True).start()
+        return _index
+
+    @staticmethod
+    def get_recommendations(db: Client, user: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        """Возвращает рекомендации из предрасчитанной таблицы (O(1) на пользователя)."""
+        index = RecommendationService._get_index(db)
+        if index is None:
+            return []
+
+        username = user.get('username')
+        reads = UserService.parse_read_poems_json(user.get('read_poems_json'))
+        recs = index.top_k.get(username)
+        if recs is None:
+            # Пользователя не было при построении индекса — считаем его строку один раз
+            recs = index.recommend_for(reads, user.get('pinned_poem_title'), settings.RECOMMENDATIONS_TOP_K)
+            index.top_k[username] = recs
+
+        # Строка могла устареть: отметку сделали в другом воркере или фоновый refresh
+        # прочитал пользователей до неё — прочитанное и изучаемое отсекаем при выдаче
+        exclude = set(reads)
+        exclude.add(user.get('pinned_poem_title'))
+        fresh = (rec for rec in recs if rec[0] not in exclude)
+        return [{"title": t, "author": a, "score": round(s, 4)} for t, a, s in itertools.islice(fresh, limit)]
+
+    @staticmethod
+    def update_user(username: str, read_titles: List[str], pinned_title: Optional[str] = None):
+        """Инкрементально пересчитывает строку пользователя после изменения прочитанного."""
+        index = _index
+        if index is None:
+            return
+        index.top_k[username] = index.recommend_for(read_titles, pinned_title, settings.RECOMMENDATIONS_TOP_K)
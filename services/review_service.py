@@ -0,0 +1,111 @@
+import datetime
+import logging
+from typing import Optional, List, Dict, Any
+
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Параметры SM-2: начальная «лёгкость» и её нижняя граница
+DEFAULT_EASINESS = 2.5
+MIN_EASINESS = 1.3
+# Оценка ниже этой считается провалом: повторения начинаются заново
+PASSING_QUALITY = 3
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class ReviewService:
+    """Интервальные повторения (SM-2) для прочитанных и изучаемых стихов.
+
+    Состояние хранится в poem_review по строке на (username, title); выборка
+    «к повторению» идёт по индексу (username, due_at) и не перебирает все стихи пользователя.
+    """
+
+    @staticmethod
+    def sm2(state: Dict[str, Any], quality: int, now: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+        """Новое состояние после ответа с оценкой quality (0–5)."""
+        now = now or _utcnow()
+        easiness = state.get('easiness') or DEFAULT_EASINESS
+        repetitions = state.get('repetitions') or 0
+        interval = state.get('interval_days') or 0
+
+        if quality < PASSING_QUALITY:
+            repetitions = 0
+            interval = 1
+        else:
+            repetitions += 1
+            if repetitions == 1:
+                interval = 1
+            elif repetitions == 2:
+                interval = 6
+            else:
+                interval = round(interval * easiness)
+
+        easiness = max(MIN_EASINESS, easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        return {
+            "easiness": round(easiness, 4),
+            "repetitions": repetitions,
+            "interval_days": interval,
+            "due_at": (now + datetime.timedelta(days=interval)).isoformat(),
+            "last_reviewed_at": now.isoformat(),
+        }
+
+    @staticmethod
+    def schedule(db: Client, username: str, titles: List[str]):
+        """Ставит стихи в очередь повторения (к повторению сразу); уже запланированные не трогает."""
+        if not titles:
+            return
+        rows = [{"username": username, "title": title, "due_at": _utcnow().isoformat()} for title in titles]
+        try:
+            db.table('poem_review').upsert(rows, on_conflict='username,title', ignore_duplicates=True).execute()
+        except Exception as e:
+            logger.error("Ошибка при планировании повторений: %s", e)
+
+    @staticmethod
+    def unschedule(db: Client, username: str, titles: List[str]):
+        if not titles:
+            return
+        try:
+            db.table('poem_review').delete().eq('username', username).in_('title', titles).execute()
+        except Exception as e:
+            logger.error("Ошибка при удалении повторений: %s", e)
+
+    @staticmethod
+    def get_due(db: Client, username: str, limit: int) -> List[Dict[str, Any]]:
+        """Стихи, срок повторения которых наступил, начиная с самых просроченных."""
+        response = (
+            db.table('poem_review')
+            .select('title, easiness, repetitions, interval_days, due_at, last_reviewed_at')
+            .eq('username', username)
+            .lte('due_at', _utcnow().isoformat())
+            .order('due_at', desc=False)
+            .limit(limit)
+            .execute()
+        )
+        return response.data or []
+
+    @staticmethod
+    def record_review(db: Client, username: str, title: str, quality: int) -> Optional[Dict[str, Any]]:
+        """Применяет оценку к стиху и возвращает новое состояние; None, если стиха нет."""
+        current = (
+            db.table('poem_review')
+            .select('easiness, repetitions, interval_days')
+            .eq('username', username)
+            .eq('title', title)
+            .execute()
+        )
+        if current.data:
+            state = current.data[0]
+        else:
+            # Стих прочитан до появления повторений — начинаем с начального состояния
+            if not db.table('poem').select('title').eq('title', title).execute().data:
+                return None
+            state = {}
+
+        new_state = ReviewService.sm2(state, quality)
+        row = {"username": username, "title": title, **new_state}
+        db.table('poem_review').upsert(row, on_conflict='username,title').execute()
+        return {"title": title, **new_state}
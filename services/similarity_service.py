@@ -0,0 +1,317 @@
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+import scipy.sparse as sp
+from supabase import Client
+
+from core.config import settings
+from services.changelog_service import ChangeLogService
+from services.poem_service import PoemService
+
+logger = logging.getLogger(__name__)
+
+# Размер пространства хешированных n-грамм: словарь не нужен,
+# поэтому строки матрицы можно обновлять по одной
+N_FEATURES = 2 ** 18
+NGRAM_RANGE = (3, 5)
+
+_INDEX_ROOT = os.path.join(settings.INDEX_DIR, "tfidf")
+_CURRENT_FILE = os.path.join(_INDEX_ROOT, "CURRENT")
+
+
+def _char_ngrams(text: str) -> Counter:
+    """Символьные n-граммы внутри слов (с пробелами по краям), захешированные в N_FEATURES."""
+    counts = Counter()
+    for word in PoemService.normalize_text(text).split():
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            for i in range(len(padded) - n + 1):
+                counts[zlib.crc32(padded[i:i + n].encode("utf-8")) % N_FEATURES] += 1
+    return counts
+
+
+def _tf_row(text: str) -> sp.csr_matrix:
+    counts = _char_ngrams(text)
+    cols = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+    # Сублинейный tf: 1 + log(tf)
+    data = np.fromiter((1.0 + math.log(c) for c in counts.values()), dtype=np.float32, count=len(counts))
+    order = np.argsort(cols)
+    return sp.csr_matrix((data[order], cols[order], np.array([0, len(cols)])), shape=(1, N_FEATURES))
+
+
+class _TfidfIndex:
+    def __init__(self, poems: List[Dict[str, str]], tf: sp.csr_matrix, df: np.ndarray, vectors: Optional[sp.csr_matrix] = None):
+        self.poems = poems
+        self.title_to_idx = {p['title']: i for i, p in enumerate(poems)}
+        self.tf = tf
+        self.df = df
+        self._idf: Optional[np.ndarray] = None
+        self.vectors = vectors if vectors is not None else self._vectorize()
+        self.version: Optional[str] = None
+        # Версия журнала изменений, по которой построен индекс; правки через хуки её не сдвигают
+        self.catalog_version = 0
+
+    @property
+    def idf(self) -> np.ndarray:
+        if self._idf is None:
+            n_docs = self.tf.shape[0]
+            self._idf = (np.log((1.0 + n_docs) / (1.0 + np.asarray(self.df))) + 1.0).astype(np.float32)
+        return self._idf
+
+    def _normalize(self, tf: sp.csr_matrix) -> sp.csr_matrix:
+        """tf * idf с L2-нормировкой строк."""
+        vectors = tf.multiply(self.idf[np.newaxis, :]).tocsr().astype(np.float32)
+        norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return (sp.diags(1.0 / norms) @ vectors).tocsr().astype(np.float32)
+
+    def _vectorize(self) -> sp.csr_matrix:
+        return self._normalize(self.tf)
+
+    def search(self, text: str, k: int) -> List[Dict[str, Any]]:
+        """Ближайшие к произвольному тексту стихи (например, к вопросу пользователя)."""
+        if not len(self.poems):
+            return []
+        query = self._normalize(_tf_row(text))
+        scores = (self.vectors @ query.T).toarray().ravel()
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {"title": self.poems[j]['title'], "author": self.poems[j]['author'], "score": round(float(scores[j]), 4)}
+            for j in top if scores[j] > 0
+        ]
+
+    def similar(self, title: str, k: int) -> List[Dict[str, Any]]:
+        i = self.title_to_idx[title]
+        scores = (self.vectors @ self.vectors[i].T).toarray().ravel()
+        scores[i] = -1.0
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {"title": self.poems[j]['title'], "author": self.poems[j]['author'], "score": round(float(scores[j]), 4)}
+            for j in top if scores[j] > 0
+        ]
+
+    def with_row(self, poem: Dict[str, str], text: str, replace_title: Optional[str] = None) -> "_TfidfIndex":
+        """Возвращает новый индекс с добавленной или заменённой строкой."""
+        row = _tf_row(text)
+        df = np.array(self.df, dtype=np.int32, copy=True)
+        poems = list(self.poems)
+        tf = self.tf
+        old_idx = self.title_to_idx.get(replace_title) if replace_title else None
+        if old_idx is None:
+            old_idx = self.title_to_idx.get(poem['title'])
+
+        df[row.indices] += 1
+        if old_idx is not None:
+            df[tf[old_idx].indices] -= 1
+            poems[old_idx] = poem
+            tf = sp.vstack([tf[:old_idx], row, tf[old_idx + 1:]], format="csr")
+        else:
+            poems.append(poem)
+            tf = sp.vstack([tf, row], format="csr")
+        index = _TfidfIndex(poems, tf, df)
+        index.catalog_version = self.catalog_version
+        return index
+
+    def without(self, title: str) -> "_TfidfIndex":
+        idx = self.title_to_idx.get(title)
+        if idx is None:
+            return self
+        df = np.array(self.df, dtype=np.int32, copy=True)
+        df[self.tf[idx].indices] -= 1
+        poems = self.poems[:idx] + self.poems[idx + 1:]
+        tf = sp.vstack([self.tf[:idx], self.tf[idx + 1:]], format="csr")
+        index = _TfidfIndex(poems, tf, df)
+        index.catalog_version = self.catalog_version
+        return index
+
+
+_index: Optional[_TfidfIndex] = None
+_index_lock = threading.Lock()
+_version_checked_at = float("-inf")
+
+
+class SimilarityService:
+    @staticmethod
+    def build_index(poems: List[Dict[str, Any]]) -> _TfidfIndex:
+        meta = [{"title": p['title'], "author": p.get('author', '')} for p in poems]
+        rows = [_tf_row(p.get('text', '')) for p in poems]
+        tf = sp.vstack(rows, format="csr") if rows else sp.csr_matrix((0, N_FEATURES), dtype=np.float32)
+        df = np.bincount(tf.indices, minlength=N_FEATURES).astype(np.int32)
+        return _TfidfIndex(meta, tf, df)
+
+    @staticmethod
+    def _save(index: _TfidfIndex):
+        """Сохраняет индекс в новый каталог и атомарно переключает указатель CURRENT."""
+        version = f"{time.time_ns()}-{os.getpid()}"
+        path = os.path.join(_INDEX_ROOT, version)
+        os.makedirs(path, exist_ok=True)
+        for name, matrix in (("tf", index.tf), ("vec", index.vectors)):
+            np.save(os.path.join(path, f"{name}_data.npy"), matrix.data)
+            np.save(os.path.join(path, f"{name}_indices.npy"), matrix.indices)
+            np.save(os.path.join(path, f"{name}_indptr.npy"), matrix.indptr)
+        np.save(os.path.join(path, "df.npy"), index.df)
+        with open(os.path.join(path, "poems.json"), "w", encoding="utf-8") as f:
+            json.dump({"catalog_version": index.catalog_version, "poems": index.poems}, f, ensure_ascii=False)
+
+        tmp_current = f"{_CURRENT_FILE}.{version}"
+        with open(tmp_current, "w") as f:
+            f.write(version)
+        os.replace(tmp_current, _CURRENT_FILE)
+        index.version = version
+
+        # Старые версии удаляем, оставляя предыдущую для воркеров, которые её ещё читают
+        versions = sorted(d for d in os.listdir(_INDEX_ROOT) if os.path.isdir(os.path.join(_INDEX_ROOT, d)))
+        for old in versions[:-2]:
+            shutil.rmtree(os.path.join(_INDEX_ROOT, old), ignore_errors=True)
+
+    @staticmethod
+    def _load(version: str) -> _TfidfIndex:
+        """Загружает индекс с диска через memory-map: страницы файлов общие для воркеров."""
+        path = os.path.join(_INDEX_ROOT, version)
+        with open(os.path.join(path, "poems.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        # Индексы старого формата хранили только список стихов — такой считаем устаревшим
+        poems = meta["poems"] if isinstance(meta, dict) else meta
+
+        def load_matrix(name: str) -> sp.csr_matrix:
+            data = np.load(os.path.join(path, f"{name}_data.npy"), mmap_mode="r")
+            indices = np.load(os.path.join(path, f"{name}_indices.npy"), mmap_mode="r")
+            indptr = np.load(os.path.join(path, f"{name}_indptr.npy"), mmap_mode="r")
+            return sp.csr_matrix((data, indices, indptr), shape=(len(poems), N_FEATURES), copy=False)
+
+        index = _TfidfIndex(poems, load_matrix("tf"), np.load(os.path.join(path, "df.npy")), load_matrix("vec"))
+        index.version = version
+        index.catalog_version = meta.get("catalog_version", 0) if isinstance(meta, dict) else 0
+        return index
+
+    @staticmethod
+    def _current_version() -> Optional[str]:
+        try:
+            with open(_CURRENT_FILE) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _rebuild(db: Client) -> _TfidfIndex:
+        """Строит индекс по всему каталогу и сохраняет его. Вызывается под _index_lock."""
+        # Версию читаем до каталога: правка между запросами даст лишнюю пересборку, а не потерю
+        catalog_version = ChangeLogService.latest_version(db)
+        poems = db.table('poem').select('title, author, text').execute().data or []
+        index = SimilarityService.build_index(poems)
+        index.catalog_version = catalog_version
+        os.makedirs(_INDEX_ROOT, exist_ok=True)
+        SimilarityService._save(index)
+        return index
+
+    @staticmethod
+    def get_index(db: Client, verify: bool = False) -> Optional[_TfidfIndex]:
+        """Возвращает актуальный индекс: с диска, если другой воркер его обновил, иначе строит заново.
+
+        Не реже раза в CATALOG_CACHE_TTL_SECONDS (и сразу при verify=True) индекс
+        сверяется с журналом изменений: правки, сделанные на другом хосте или
+        в другом инстансе, сюда через хуки не приходят.
+        """
+        global _index, _version_checked_at
+        version = SimilarityService._current_version()
+        if _index is None or _index.version != version:
+            with _index_lock:
+                if _index is None or _index.version != version:
+                    try:
+                        _index = SimilarityService._load(version) if version else SimilarityService._rebuild(db)
+                    except Exception as e:
+                        logger.error("Ошибка при загрузке TF-IDF индекса: %s", e)
+
+        if _index is None:
+            return None
+        if not verify and time.monotonic() - _version_checked_at < settings.CATALOG_CACHE_TTL_SECONDS:
+            return _index
+
+        _version_checked_at = time.monotonic()
+        try:
+            latest = ChangeLogService.latest_version(db)
+            if latest != _index.catalog_version:
+                with _index_lock:
+                    if latest != _index.catalog_version:
+                        _index = SimilarityService._rebuild(db)
+        except Exception as e:
+            logger.error("Ошибка при сверке TF-IDF индекса с журналом изменений: %s", e)
+        return _index
+
+    @staticmethod
+    def find_similar(db: Client, title: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Похожие по тексту стихи; None, если стиха нет в каталоге."""
+        index = SimilarityService.get_index(db)
+        if index is not None and title not in index.title_to_idx:
+            # Стих мог появиться на другом хосте: перед ответом 404 сверяемся с журналом
+            index = SimilarityService.get_index(db, verify=True)
+        if index is None or title not in index.title_to_idx:
+            return None
+        return index.similar(title, limit)
+
+    @staticmethod
+    def search(db: Client, text: str, limit: int) -> List[Dict[str, Any]]:
+        index = SimilarityService.get_index(db)
+        if index is None:
+            return []
+        return index.search(text, limit)
+
+    @staticmethod
+    def _advance(index: _TfidfIndex, version: Optional[int], changes: int):
+        """Сдвигает версию индекса на записанные изменения, если между ними нет чужих.
+
+        При пропуске версия остаётся старой, и ближайшая сверка в get_index пересоберёт индекс.
+        """
+        if version is not None and version == index.catalog_version + changes:
+            index.catalog_version = version
+
+    @staticmethod
+    def upsert_poem(db: Client, poem: Dict[str, Any], old_title: Optional[str] = None,
+                    version: Optional[int] = None, changes: int = 1):
+        """Инкрементально обновляет строку стиха после добавления или редактирования.
+
+        version — последняя версия журнала после записи, changes — сколько версий она заняла.
+        """
+        global _index
+        index = SimilarityService.get_index(db)
+        if index is None:
+            return
+        with _index_lock:
+            meta = {"title": poem['title'], "author": poem.get('author', '')}
+            new_index = index.with_row(meta, poem.get('text', ''), replace_title=old_title)
+            SimilarityService._advance(new_index, version, changes)
+            try:
+                SimilarityService._save(new_index)
+            except OSError as e:
+                logger.error("Ошибка при сохранении TF-IDF индекса: %s", e)
+            _index = new_index
+
+    @staticmethod
+    def remove_poem(db: Client, title: str, version: Optional[int] = None):
+        global _index
+        index = SimilarityService.get_index(db)
+        if index is None:
+            return
+        with _index_lock:
+            new_index = index.without(title)
+            SimilarityService._advance(new_index, version, 1)
+            try:
+                SimilarityService._save(new_index)
+            except OSError as e:
+                logger.error("Ошибка при сохранении TF-IDF индекса: %s", e)
+            _index = new_index
@@ -1,7 +1,10 @@
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from supabase import Client
 
+from services.progress_service import ProgressService
+from services.review_service import ReviewService
+
 class UserService:
     @staticmethod
     def get_read_poems_titles(user: Dict[str, Any]) -> List[str]:
@@ -14,22 +17,94 @@ class UserService:
         return title in UserService.get_read_poems_titles(user)
 
     @staticmethod
-    def toggle_poem_read_status(db: Client, username: str, title: str, current_reads: List[str]) -> tuple[str, List[str]]:
-        """Переключает статус прочтения стиха."""
+    def toggle_poem_read_status(
+        db: Client,
+        username: str,
+        title: str,
+        current_reads: List[str],
+        progress: Optional[Dict[str, Any]] = None,
+        author: Optional[str] = None,
+        pinned_title: Optional[str] = None,
+    ) -> tuple[str, List[str]]:
+        """Переключает статус прочтения стиха.
+
+        Если переданы счётчики прогресса, они обновляются инкрементально
+        и сохраняются тем же запросом, что и список прочитанного.
+        Изучаемый стих (pinned_title) остаётся в расписании повторений и без отметки.
+        """
         if title in current_reads:
             current_reads.remove(title)
             action = 'unmarked'
         else:
             current_reads.append(title)
             action = 'marked'
-        
+
+        update_data = {"read_poems_json": current_reads}
+        if progress is not None:
+            update_data["progress_stats"] = ProgressService.apply_toggle(progress, author, action)
+
         # Сохраняем в БД
-        db.table('user').update({"read_poems_json": current_reads}).eq("username", username).execute()
+        db.table('user').update(update_data).eq("username", username).execute()
+        if action == 'marked':
+            ReviewService.schedule(db, username, [title])
+        elif title != pinned_title:
+            ReviewService.unschedule(db, username, [title])
         return action, current_reads
 
     @staticmethod
-    def toggle_pinned_poem(db: Client, username: str, title: str, current_pinned: str) -> tuple[str, str]:
-        """Переключает статус изучаемого стиха."""
+    def set_poems_read_status(
+        db: Client,
+        username: str,
+        poems: Dict[str, str],
+        read: bool,
+        current_reads: List[str],
+        progress: Optional[Dict[str, Any]] = None,
+        pinned_title: Optional[str] = None,
+    ) -> tuple[List[str], List[str]]:
+        """Отмечает (read=True) или снимает отметку со всех стихов `poems` («название → автор»).
+
+        Все изменения сохраняются одним запросом; стихи, уже находящиеся
+        в нужном состоянии, не трогаются. Возвращает изменённые названия и новый список.
+        """
+        already_read = set(current_reads)
+        if read:
+            changed = [title for title in poems if title not in already_read]
+            new_reads = current_reads + changed
+        else:
+            changed = [title for title in poems if title in already_read]
+            removed = set(changed)
+            new_reads = [title for title in current_reads if title not in removed]
+
+        if not changed:
+            return changed, current_reads
+
+        update_data = {"read_poems_json": new_reads}
+        if progress is not None:
+            action = 'marked' if read else 'unmarked'
+            for title in changed:
+                progress = ProgressService.apply_toggle(progress, poems[title], action)
+            update_data["progress_stats"] = progress
+
+        db.table('user').update(update_data).eq("username", username).execute()
+        if read:
+            ReviewService.schedule(db, username, changed)
+        else:
+            ReviewService.unschedule(db, username, [title for title in changed if title != pinned_title])
+        return changed, new_reads
+
+    @staticmethod
+    def toggle_pinned_poem(
+        db: Client,
+        username: str,
+        title: str,
+        current_pinned: str,
+        read_titles: Optional[List[str]] = None,
+    ) -> tuple[str, str]:
+        """Переключает статус изучаемого стиха.
+
+        Откреплённый стих, которого нет в read_titles, убирается из расписания повторений:
+        там его держало только закрепление.
+        """
         if current_pinned == title:
             new_pinned = None
             action = 'unpinned'
@@ -39,6 +114,11 @@ class UserService:
         
         # Сохраняем в БД
         db.table('user').update({'pinned_poem_title': new_pinned}).eq('username', username).execute()
+        # Изучаемый стих повторяется; у прочитанного после открепления история повторений сохраняется
+        if new_pinned:
+            ReviewService.schedule(db, username, [new_pinned])
+        if current_pinned and current_pinned != new_pinned and read_titles is not None and current_pinned not in read_titles:
+            ReviewService.unschedule(db, username, [current_pinned])
         return action, new_pinned
 
     @staticmethod
@@ -0,0 +1,357 @@
+let allPoems = [];
+let filteredPoems = [];
+let isEditing = false;
+let currentSort = { type: 'title', order: 'asc' };
+
+const searchInput = document.getElementById('search-input');
+const poemsTableBody = document.getElementById('poems-table-body');
+const noResultsMessage = document.getElementById('no-results-message');
+const modal = document.getElementById('poem-modal');
+const modalForm = document.getElementById('poem-form');
+const modalHeading = document.getElementById('modal-heading');
+const modalSubmitBtn = document.getElementById('modal-submit-btn');
+const modalError = document.getElementById('modal-error');
+const originalTitleInput = document.getElementById('original-title');
+
+function showMessage(message, category = 'success') {
+    const container = document.getElementById('flash-messages');
+    if (!container) return;
+
+    const div = document.createElement('div');
+    const colors = {
+        success: 'bg-green-100 text-green-700',
+        warning: 'bg-yellow-100 text-yellow-800',
+        error: 'bg-red-100 text-red-700'
+    };
+    div.className = `p-3 text-sm rounded-lg shadow-sm ${colors[category] || colors.error}`;
+    div.textContent = message;
+    container.prepend(div);
+
+    setTimeout(() => div.remove(), 5000);
+}
+
+function closeModal() {
+    modal.classList.remove('open');
+    modalForm.reset();
+    originalTitleInput.value = '';
+    modalError.classList.add('hidden');
+}
+
+function openModal(poem = null) {
+    modalForm.reset();
+    modalError.classList.add('hidden');
+
+    if (poem) {
+        isEditing = true;
+        modalHeading.textContent = `Редактировать: "${poem.title}"`;
+        modalSubmitBtn.textContent = 'Сохранить изменения';
+        document.getElementById('title').value = poem.title;
+        document.getElementById('author').value = poem.author;
+        document.getElementById('text').value = poem.text;
+        originalTitleInput.value = poem.title;
+    } else {
+        isEditing = false;
+        modalHeading.textContent = 'Добавить Новый Стих 📝';
+        modalSubmitBtn.textContent = 'Добавить стих';
+        originalTitleInput.value = '';
+    }
+
+    modal.classList.add('open');
+}
+
+function createTableRow(poem) {
+    const tr = document.createElement('tr');
+    tr.className = 'hover:bg-gray-50';
+    tr.dataset.title = poem.title;
+
+    tr.innerHTML = `
+        <td class="px-4 py-3 font-medium text-gray-900 break-words">${poem.title}</td>
+        <td class="px-4 py-3 text-gray-700">${poem.author}</td>
+        <td class="px-4 py-3 text-gray-700 text-center">${poem.line_count}</td>
+        <td class="px-4 py-3 text-center whitespace-nowrap">
+            <button data-title="${poem.title}" data-action="edit"
+                class="text-yellow-600 hover:text-yellow-800 font-semibold px-3 py-1 rounded-lg transition-colors duration-150 text-sm">
+                Редактировать
+            </button>
+            <button data-title="${poem.title}" data-action="delete"
+                class="text-red-600 hover:text-red-800 font-semibold px-3 py-1 rounded-lg transition-colors duration-150 text-sm ml-2">
+                Удалить
+            </button>
+        </td>
+    `;
+    return tr;
+}
+
+function sortPoems(poems) {
+    poems.sort((a, b) => {
+        let valA, valB;
+
+        if (currentSort.type === 'length') {
+            valA = a.line_count;
+            valB = b.line_count;
+        } else {
+            valA = a[currentSort.type].toLowerCase();
+            valB = b[currentSort.type].toLowerCase();
+        }
+
+        if (valA < valB) return currentSort.order === 'asc' ? -1 : 1;
+        if (valA > valB) return currentSort.order === 'asc' ? 1 : -1;
+        return 0;
+    });
+    return poems;
+}
+
+function renderTable(poems) {
+    poemsTableBody.innerHTML = '';
+    if (poems.length === 0) {
+        noResultsMessage.classList.remove('hidden');
+    } else {
+        noResultsMessage.classList.add('hidden');
+        poems.forEach(poem => {
+            poemsTableBody.appendChild(createTableRow(poem));
+        });
+    }
+}
+
+function filterAndRender() {
+    const searchText = searchInput.value.toLowerCase().trim();
+
+    filteredPoems = allPoems.filter(poem => {
+        return poem.title.toLowerCase().includes(searchText) ||
+            poem.author.toLowerCase().includes(searchText) ||
+            poem.text.toLowerCase().includes(searchText);
+    });
+
+    const sortedPoems = sortPoems(filteredPoems);
+    renderTable(sortedPoems);
+}
+
+// Версия журнала изменений, до которой синхронизирован allPoems
+let catalogVersion = 0;
+
+let loadingPoems = null;
+let reloadPoems = false;
+
+async function loadPoems() {
+    // Один запрос за раз: вызовы во время загрузки сводятся к одной повторной
+    if (loadingPoems) {
+        reloadPoems = true;
+        return loadingPoems;
+    }
+    loadingPoems = fetchPoemChanges();
+    try {
+        await loadingPoems;
+    } finally {
+        loadingPoems = null;
+    }
+    if (reloadPoems) {
+        reloadPoems = false;
+        await loadPoems();
+    }
+}
+
+async function fetchPoemChanges() {
+    try {
+        const response = await fetch(`${adminUrls.poemChanges}?since=${catalogVersion}`);
+        if (!response.ok) {
+            throw new Error('Не удалось загрузить стихи.');
+        }
+        const data = await response.json();
+        if (data.full) {
+            allPoems = data.poems || [];
+        } else {
+            const changed = new Set([...data.deletes, ...data.upserts.map(p => p.title)]);
+            allPoems = allPoems.filter(p => !changed.has(p.title)).concat(data.upserts);
+        }
+        catalogVersion = data.version;
+        filterAndRender();
+    } catch (error) {
+        console.error('Ошибка загрузки данных:', error);
+        showMessage('Критическая ошибка: не удалось загрузить данные стихов.', 'error');
+    }
+}
+
+async function handleSubmit(event) {
+    event.preventDefault();
+    modalError.classList.add('hidden');
+    modalSubmitBtn.disabled = true;
+
+    const title = document.getElementById('title').value.trim();
+    const author = document.getElementById('author').value.trim();
+    const text = document.getElementById('text').value.trim();
+    const originalTitle = originalTitleInput.value;
+
+    if (!title || !author || !text) {
+        modalError.textContent = 'Все поля должны быть заполнены.';
+        modalError.classList.remove('hidden');
+        modalSubmitBtn.disabled = false;
+        return;
+    }
+
+    let url, method;
+
+    if (isEditing) {
+        url = adminUrls.editPoem.replace('TEMP', encodeURIComponent(originalTitle));
+        method = 'POST';
+    } else {
+        url = adminUrls.addPoem;
+        method = 'POST';
+    }
+
+    try {
+        const response = await fetch(url, {
+            method: method,
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ title, author, text })
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            const newPoem = data.poem;
+
+            if (isEditing) {
+                allPoems = allPoems.filter(p => p.title !== originalTitle);
+            }
+            allPoems.push(newPoem);
+
+            showMessage(data.message, 'success');
+            if (data.duplicates && data.duplicates.length > 0) {
+                const titles = data.duplicates.map(d => `"${d.title}" (${Math.round(d.similarity * 100)}%)`).join(', ');
+                showMessage(`Возможный дубликат: ${titles}`, 'warning');
+            }
+            closeModal();
+            filterAndRender();
+        } else {
+            modalError.textContent = data.detail || 'Произошла ошибка на сервере.';
+            modalError.classList.remove('hidden');
+        }
+    } catch (error) {
+        modalError.textContent = 'Сетевая ошибка. Проверьте соединение.';
+        modalError.classList.remove('hidden');
+    } finally {
+        modalSubmitBtn.disabled = false;
+    }
+}
+
+async function handleDelete(title) {
+    if (!confirm(`Вы уверены, что хотите удалить стих "${title}"? Это действие необратимо и удалит его у всех пользователей!`)) {
+        return;
+    }
+
+    const url = `/delete_poem/${encodeURIComponent(title)}`;
+
+    try {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+        });
+
+        if (response.ok) {
+            allPoems = allPoems.filter(p => p.title !== title);
+            showMessage(`Стих "${title}" успешно удален.`, 'success');
+            filterAndRender();
+        } else {
+            const errorData = await response.json();
+            showMessage(`Ошибка при удалении: ${errorData.detail}`, 'error');
+        }
+    } catch (error) {
+        showMessage('Сетевая ошибка при удалении.', 'error');
+    }
+}
+
+function applyCatalogEvent(event) {
+    // Событие применяем, только если оно продолжает нашу версию без пропусков;
+    // иначе (пропущено событие, журнал не записался) догружаем дельту с сервера
+    if (!event.version || event.version !== catalogVersion + (event.changes || 1)) {
+        loadPoems();
+        return;
+    }
+    catalogVersion = event.version;
+    if (event.type === 'deleted') {
+        allPoems = allPoems.filter(p => p.title !== event.title);
+    } else {
+        const replaced = event.old_title || event.poem.title;
+        allPoems = allPoems.filter(p => p.title !== replaced && p.title !== event.poem.title);
+        allPoems.push(event.poem);
+    }
+    filterAndRender();
+}
+
+function subscribeToCatalogEvents() {
+    if (!window.EventSource) return;
+    const source = new EventSource(adminUrls.poemEvents);
+    source.addEventListener('poem', (message) => {
+        try {
+            applyCatalogEvent(JSON.parse(message.data));
+        } catch (error) {
+            console.error('Ошибка обработки события каталога:', error);
+        }
+    });
+    // После переподключения (например, из-за переполнения очереди) догружаем пропущенные изменения
+    let connectedOnce = false;
+    source.addEventListener('open', () => {
+        if (connectedOnce) loadPoems();
+        connectedOnce = true;
+    });
+}
+
+window.onload = () => {
+    loadPoems();
+    subscribeToCatalogEvents();
+
+    document.getElementById('add-new-poem-btn').addEventListener('click', () => openModal());
+    document.getElementById('close-modal-btn').addEventListener('click', closeModal);
+    modal.addEventListener('click', (event) => {
+        if (event.target === modal) closeModal();
+    });
+    document.addEventListener('keydown', (event) => {
+        if (event.key === 'Escape' && modal.classList.contains('open')) closeModal();
+    });
+
+    searchInput.addEventListener('input', filterAndRender);
+    modalForm.addEventListener('submit', handleSubmit);
+
+    poemsTableBody.addEventListener('click', (e) => {
+        const targetBtn = e.target.closest('button[data-action]');
+        if (!targetBtn) return;
+
+        const title = targetBtn.dataset.title;
+        const poem = allPoems.find(p => p.title === title);
+
+        if (targetBtn.dataset.action === 'edit' && poem) {
+            openModal(poem);
+        } else if (targetBtn.dataset.action === 'delete') {
+            handleDelete(title);
+        }
+    });
+
+    document.querySelectorAll('.sortable').forEach(header => {
+        header.addEventListener('click', () => {
+            const sortType = header.dataset.sort;
+            let sortOrder = header.dataset.order;
+
+            if (currentSort.type === sortType) {
+                sortOrder = (currentSort.order === 'asc' || currentSort.order === 'none') ? 'desc' : 'asc';
+            } else {
+                sortOrder = 'asc';
+            }
+
+            currentSort = { type: sortType, order: sortOrder };
+
+            document.querySelectorAll('.sortable').forEach(h => {
+                h.dataset.order = 'none';
+                h.querySelector('span') && h.querySelector('span').remove();
+            });
+
+            header.dataset.order = sortOrder;
+            const orderSymbol = sortOrder === 'asc' ? '▲' : '▼';
+            const orderSpan = document.createElement('span');
+            orderSpan.className = `${sortType}-order text-sky-500 ml-1`;
+            orderSpan.textContent = orderSymbol;
+            header.appendChild(orderSpan);
+
+            filterAndRender();
+        });
+    });
+};
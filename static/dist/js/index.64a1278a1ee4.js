@@ -0,0 +1,537 @@
+// --- 1. ЛОГИКА ФИЛЬТРАЦИИ И СОРТИРОВКИ ---
+let allPoems = [];
+let currentPoem = null;
+let currentFilter = isAuthenticated ? 'unread' : 'unfiltered';
+let currentSort = { type: 'title', order: 'asc' };
+
+const poemsContainer = document.getElementById('poems-container');
+const searchInput = document.getElementById('search-input');
+const sortButtonsContainer = document.getElementById('sort-buttons-container');
+const tabButtons = document.querySelectorAll('.tab');
+const noResultsMessage = document.getElementById('no-results-message');
+const modal = document.getElementById('poem-modal');
+const closeModalBtn = document.getElementById('close-modal-btn');
+
+// --- ФУНКЦИИ ---
+const createPoemCard = (poem) => {
+    const isRead = readPoemsTitles.has(poem.title);
+    const isPinned = poem.title === pinnedPoemTitle;
+
+    const card = document.createElement('div');
+    let borderClass = 'border-gray-200';
+    if (isPinned) {
+        borderClass = 'border-orange-500 ring-2 ring-orange-200';
+    } else if (isRead) {
+        borderClass = 'border-sky-100';
+    }
+
+    card.className = `poem-card cursor-pointer p-6 bg-white rounded-xl shadow-lg border-2 ${borderClass} hover:border-sky-500`;
+    card.innerHTML = `
+        <h3 class="text-xl font-bold text-gray-900 mb-1 break-words">${poem.title}</h3>
+        <p class="text-sm text-gray-500 mb-3 italic">Автор: ${poem.author}</p>
+        <p class="text-sm text-gray-500">${poem.line_count} строк</p>
+        ${isAuthenticated ? `
+        <div class="flex flex-wrap gap-2 mt-2">
+            <span class="inline-block px-3 py-1 text-xs font-semibold rounded-full ${isRead ? 'bg-sky-500 text-white' : 'bg-gray-100 text-gray-700'}">
+                ${isRead ? 'Прочитано' : 'Не прочитано'}
+            </span>
+            ${isPinned ? `
+            <span class="inline-block px-3 py-1 text-xs font-semibold rounded-full bg-orange-500 text-white flex items-center">
+                <svg class="w-3 h-3 mr-1" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M15 10l4.5 4.5l-4.5 4.5l-4.5-4.5L15 10zM12 21V3" /></svg>
+                Изучаю
+            </span>` : ''}
+        </div>
+        ` : ''}
+    `;
+    card.onclick = () => openModal(poem.title);
+    return card;
+};
+
+const filterAndRender = () => {
+    const searchText = searchInput.value.toLowerCase().trim();
+    let filteredPoems = allPoems.filter(poem => {
+        const matchesSearch = poem.title.toLowerCase().includes(searchText) ||
+            poem.author.toLowerCase().includes(searchText) ||
+            poem.text.toLowerCase().includes(searchText);
+        if (!matchesSearch) return false;
+        if (!isAuthenticated) return true;
+        const isRead = readPoemsTitles.has(poem.title);
+        if (currentFilter === 'unread') return !isRead;
+        if (currentFilter === 'read') return isRead;
+        return true;
+    });
+
+    let pinnedPoem = null;
+    let finalPoems = [];
+    if (isAuthenticated && pinnedPoemTitle) {
+        pinnedPoem = filteredPoems.find(p => p.title === pinnedPoemTitle);
+        if (pinnedPoem) {
+            filteredPoems = filteredPoems.filter(p => p.title !== pinnedPoemTitle);
+        }
+    }
+
+    filteredPoems.sort((a, b) => {
+        let valA, valB;
+        if (currentSort.type === 'length') {
+            valA = a.line_count;
+            valB = b.line_count;
+        } else if (currentSort.type === 'author') {
+            valA = a.author.toLowerCase();
+            valB = b.author.toLowerCase();
+        } else {
+            valA = a.title.toLowerCase();
+            valB = b.title.toLowerCase();
+        }
+        if (valA < valB) return currentSort.order === 'asc' ? -1 : 1;
+        if (valA > valB) return currentSort.order === 'asc' ? 1 : -1;
+        return 0;
+    });
+
+    if (pinnedPoem) finalPoems.push(pinnedPoem);
+    finalPoems.push(...filteredPoems);
+
+    poemsContainer.innerHTML = '';
+    if (finalPoems.length === 0) {
+        noResultsMessage.classList.remove('hidden');
+    } else {
+        noResultsMessage.classList.add('hidden');
+        finalPoems.forEach(poem => {
+            poemsContainer.appendChild(createPoemCard(poem));
+        });
+    }
+};
+
+const updateTabCounts = () => {
+    if (!isAuthenticated) {
+        document.getElementById('count-all').textContent = allPoems.length;
+        return;
+    }
+    const readCount = allPoems.filter(poem => readPoemsTitles.has(poem.title)).length;
+    const unreadCount = allPoems.length - readCount;
+    document.getElementById('count-all').textContent = allPoems.length;
+    document.getElementById('count-unread').textContent = unreadCount;
+    document.getElementById('count-read').textContent = readCount;
+};
+
+const openModal = (title) => {
+    currentPoem = allPoems.find(p => p.title === title);
+    if (!currentPoem) {
+        console.error('Стих не найден:', title);
+        return;
+    }
+
+    document.getElementById('modal-title').textContent = currentPoem.title;
+    document.getElementById('modal-author').textContent = `Автор: ${currentPoem.author}`;
+    document.getElementById('modal-text').textContent = currentPoem.text;
+
+    if (isAuthenticated) {
+        const isRead = readPoemsTitles.has(title);
+        const isPinned = title === pinnedPoemTitle;
+
+        updateModalReadButton(isRead);
+        updateModalPinButton(isPinned);
+
+        document.getElementById('read-button-wrapper').classList.remove('hidden');
+        document.getElementById('pin-button-wrapper').classList.remove('hidden');
+        document.getElementById('ai-button-wrapper').classList.remove('hidden');
+
+        // Устанавливаем обработчики через onclick (более надежно)
+        const readBtn = document.getElementById('toggle-read-btn');
+        const pinBtn = document.getElementById('toggle-pin-btn');
+        const aiBtn = document.getElementById('ai-btn');
+
+        if (readBtn) {
+            readBtn.onclick = handleToggleRead;
+        }
+        if (pinBtn) {
+            pinBtn.onclick = handleTogglePin;
+        }
+        if (aiBtn) {
+            aiBtn.onclick = openAiModal;
+        }
+
+    } else {
+        document.getElementById('read-button-wrapper').classList.add('hidden');
+        document.getElementById('pin-button-wrapper').classList.add('hidden');
+        document.getElementById('ai-button-wrapper').classList.add('hidden');
+    }
+
+    modal.classList.add('open');
+};
+
+const closeModal = () => {
+    modal.classList.remove('open');
+    currentPoem = null;
+};
+
+let hasAiAccess = isAdmin; // Admins have access by default
+const aiModal = document.getElementById('ai-modal');
+
+const openAiModal = () => {
+    aiModal.classList.add('open');
+    if (hasAiAccess) {
+        document.getElementById('ai-chat-interface').classList.remove('hidden');
+        document.getElementById('ai-key-entry').classList.add('hidden');
+    } else {
+        document.getElementById('ai-key-entry').classList.remove('hidden');
+        document.getElementById('ai-chat-interface').classList.add('hidden');
+    }
+};
+
+const closeAiModal = () => {
+    aiModal.classList.remove('open');
+};
+
+const handleAiKeySubmit = async (event) => {
+    event.preventDefault();
+    const key = document.getElementById('ai-key-input').value;
+    if (!key) return;
+
+    // This endpoint doesn't exist yet, so this will fail.
+    // I will create it in routers/ai.py
+    try {
+        const response = await fetch('/ai/verify_key', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ key: key })
+        });
+
+        if (response.ok) {
+            hasAiAccess = true;
+            openAiModal();
+            showNotification('Ключ принят! Доступ предоставлен.', 'success');
+        } else {
+            const error = await response.json();
+            showNotification(`Ошибка: ${error.detail}`, 'error');
+        }
+    } catch (err) {
+        showNotification('Сетевая ошибка.', 'error');
+    }
+};
+
+const handleAiChatSubmit = async (event) => {
+    event.preventDefault();
+    const input = document.getElementById('ai-chat-input');
+    const prompt = input.value;
+    if (!prompt) return;
+
+    const chatHistory = document.getElementById('ai-chat-history');
+    const userMessage = document.createElement('div');
+    userMessage.className = 'text-right mb-2';
+    userMessage.innerHTML = `<span class="bg-sky-500 text-white rounded-lg px-3 py-1 inline-block">${prompt}</span>`;
+    chatHistory.appendChild(userMessage);
+    input.value = '';
+
+    try {
+        let url = `/ai/chat?prompt=${encodeURIComponent(prompt)}`;
+        if (currentPoem) url += `&poem_title=${encodeURIComponent(currentPoem.title)}`;
+        const response = await fetch(url, { method: 'POST' });
+        if (response.ok) {
+            const data = await response.json();
+            const aiMessage = document.createElement('div');
+            aiMessage.className = 'text-left mb-2';
+            aiMessage.innerHTML = `<span class="bg-gray-200 text-gray-800 rounded-lg px-3 py-1 inline-block">${data.response}</span>`;
+            chatHistory.appendChild(aiMessage);
+            chatHistory.scrollTop = chatHistory.scrollHeight;
+        } else {
+             showNotification('Ошибка ответа от AI.', 'error');
+        }
+    } catch (err) {
+        showNotification('Сетевая ошибка.', 'error');
+    }
+};
+
+const updateModalReadButton = (isRead) => {
+    const toggleReadBtn = document.getElementById('toggle-read-btn');
+    const readStatusText = document.getElementById('read-status-text');
+    if (!toggleReadBtn) return;
+
+    if (isRead) {
+        toggleReadBtn.classList.remove('bg-gray-100', 'text-gray-700');
+        toggleReadBtn.classList.add('bg-sky-500', 'text-white');
+        readStatusText.textContent = 'Прочитано';
+    } else {
+        toggleReadBtn.classList.remove('bg-sky-500', 'text-white');
+        toggleReadBtn.classList.add('bg-gray-100', 'text-gray-700');
+        readStatusText.textContent = 'Отметить как прочитанное';
+    }
+};
+
+const updateModalPinButton = (isPinned) => {
+    const togglePinBtn = document.getElementById('toggle-pin-btn');
+    const pinStatusText = document.getElementById('pin-status-text');
+    if (!togglePinBtn) return;
+
+    if (isPinned) {
+        togglePinBtn.classList.remove('bg-gray-100', 'text-gray-700');
+        togglePinBtn.classList.add('bg-orange-500', 'text-white');
+        pinStatusText.textContent = 'Изучаемый стих';
+    } else {
+        togglePinBtn.classList.remove('bg-orange-500', 'text-white');
+        togglePinBtn.classList.add('bg-gray-100', 'text-gray-700');
+        pinStatusText.textContent = 'Закрепить для изучения';
+    }
+};
+
+const handleToggleRead = async () => {
+    if (!currentPoem) return;
+
+    const url = `/toggle_read`;
+    console.log('Toggle read URL:', url, 'Title:', currentPoem.title);
+
+    try {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            },
+            body: JSON.stringify({ title: currentPoem.title })
+        });
+
+        console.log('Response status:', response.status);
+
+        if (response.ok) {
+            const data = await response.json();
+            console.log('Response data:', data);
+
+            if (data.action === 'marked') {
+                readPoemsTitles.add(currentPoem.title);
+            } else {
+                readPoemsTitles.delete(currentPoem.title);
+            }
+
+            updateModalReadButton(readPoemsTitles.has(currentPoem.title));
+            updateTabCounts();
+            filterAndRender();
+
+            // Показываем сообщение об успехе
+            showNotification(`Стих "${currentPoem.title}" ${data.action === 'marked' ? 'отмечен как прочитанный' : 'удален из прочитанных'}`, 'success');
+
+        } else {
+            const errorData = await response.json().catch(() => ({}));
+            console.error('Ошибка при переключении статуса прочтения:', errorData);
+            showNotification('Ошибка: ' + (errorData.detail || 'Не удалось обновить статус'), 'error');
+        }
+    } catch (error) {
+        showNotification('Сетевая ошибка. Проверьте подключение к интернету.', 'error');
+    }
+};
+
+const handleTogglePin = async () => {
+    if (!currentPoem) return;
+
+    const url = `/toggle_pin`;
+    console.log('Toggle pin URL:', url, 'Title:', currentPoem.title);
+
+    try {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            },
+            body: JSON.stringify({ title: currentPoem.title })
+        });
+
+        console.log('Response status:', response.status);
+
+        if (response.ok) {
+            const data = await response.json();
+            console.log('Response data:', data);
+
+            pinnedPoemTitle = data.pinned_title;
+            updateModalPinButton(currentPoem.title === pinnedPoemTitle);
+            updateTabCounts();
+            filterAndRender();
+
+            // Показываем сообщение об успехе
+            showNotification(`Стих "${currentPoem.title}" ${data.action === 'pinned' ? 'закреплен для изучения' : 'откреплен'}`, 'success');
+
+        } else {
+            const errorData = await response.json().catch(() => ({}));
+            console.error('Ошибка при переключении закрепления:', errorData);
+            showNotification('Ошибка: ' + (errorData.detail || 'Не удалось обновить статус'), 'error');
+        }
+    } catch (error) {
+        console.error('Сетевая ошибка при переключении закрепления:', error);
+        showNotification('Сетевая ошибка. Проверьте подключение к интернету.', 'error');
+    }
+};
+
+// --- ЖИВЫЕ ОБНОВЛЕНИЯ КАТАЛОГА ---
+// Версия журнала изменений, до которой синхронизирован allPoems
+let catalogVersion = initialCatalogVersion;
+let loadingChanges = null;
+let reloadChanges = false;
+
+const fetchCatalogChanges = async () => {
+    try {
+        const response = await fetch(`${poemChangesUrl}?since=${catalogVersion}`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const data = await response.json();
+        if (data.full) {
+            allPoems = data.poems || [];
+        } else {
+            const changed = new Set([...data.deletes, ...data.upserts.map(p => p.title)]);
+            allPoems = allPoems.filter(p => !changed.has(p.title)).concat(data.upserts);
+        }
+        catalogVersion = data.version;
+        updateTabCounts();
+        filterAndRender();
+    } catch (err) {
+        console.error('Ошибка догрузки изменений каталога:', err);
+    }
+};
+
+// Один запрос за раз: вызовы во время загрузки сводятся к одной повторной
+const loadCatalogChanges = async () => {
+    if (loadingChanges) {
+        reloadChanges = true;
+        return loadingChanges;
+    }
+    loadingChanges = fetchCatalogChanges();
+    try {
+        await loadingChanges;
+    } finally {
+        loadingChanges = null;
+    }
+    if (reloadChanges) {
+        reloadChanges = false;
+        await loadCatalogChanges();
+    }
+};
+
+const applyCatalogEvent = (event) => {
+    // Событие с пропуском версий (потеряно при переподключении) — догружаем дельту с сервера
+    if (!event.version || event.version !== catalogVersion + (event.changes || 1)) {
+        loadCatalogChanges();
+        return;
+    }
+    catalogVersion = event.version;
+    if (event.type === 'deleted') {
+        allPoems = allPoems.filter(p => p.title !== event.title);
+    } else {
+        const replaced = event.old_title || event.poem.title;
+        allPoems = allPoems.filter(p => p.title !== replaced && p.title !== event.poem.title);
+        allPoems.push(event.poem);
+        // Отметки о прочтении хранятся на сервере по названию и при переименовании
+        // не переносятся — клиент показывает то же, что вернёт сервер после перезагрузки
+    }
+    updateTabCounts();
+    filterAndRender();
+};
+
+const subscribeToCatalogEvents = () => {
+    if (!window.EventSource) return;
+    const source = new EventSource('/events/poems');
+    source.addEventListener('poem', (message) => {
+        try {
+            applyCatalogEvent(JSON.parse(message.data));
+        } catch (err) {
+            console.error('Ошибка обработки события каталога:', err);
+        }
+    });
+    // После переподключения (сервер сбрасывает отстающих клиентов, рвётся сеть)
+    // догружаем изменения, пропущенные за время разрыва
+    let connectedOnce = false;
+    source.addEventListener('open', () => {
+        if (connectedOnce) loadCatalogChanges();
+        connectedOnce = true;
+    });
+};
+
+// --- ОБРАБОТЧИКИ СОБЫТИЙ ---
+window.onload = () => {
+    allPoems = allData;
+
+    // Настройка иконок сортировки
+    const allIcons = document.querySelectorAll('.sort-arrow-icon');
+    allIcons.forEach(icon => {
+        if (icon.dataset.sortIcon === currentSort.type) {
+            icon.style.opacity = 1;
+            icon.style.transform = currentSort.order === 'desc' ? 'rotate(180deg)' : 'rotate(0deg)';
+        } else {
+            icon.style.opacity = 0;
+        }
+    });
+
+    updateTabCounts();
+    filterAndRender();
+    subscribeToCatalogEvents();
+
+    // Обработчики вкладок
+    tabButtons.forEach(button => {
+        button.addEventListener('click', () => {
+            const currentActive = document.querySelector('.tab.active');
+            if (currentActive) currentActive.classList.remove('active');
+            button.classList.add('active');
+            currentFilter = button.dataset.filter;
+            filterAndRender();
+        });
+    });
+
+    // Закрытие модального окна
+    closeModalBtn.addEventListener('click', closeModal);
+    modal.addEventListener('click', (event) => {
+        if (event.target === modal) closeModal();
+    });
+
+    // Поиск
+    searchInput.addEventListener('input', filterAndRender);
+
+    // Сортировка
+    sortButtonsContainer.addEventListener('click', (e) => {
+        const targetButton = e.target.closest('button.sort-btn');
+        if (!targetButton) return;
+
+        const newSortType = targetButton.dataset.sort;
+        if (newSortType === currentSort.type) {
+            currentSort.order = currentSort.order === 'asc' ? 'desc' : 'asc';
+        } else {
+            currentSort.type = newSortType;
+            currentSort.order = 'asc';
+        }
+
+        targetButton.dataset.order = currentSort.order;
+        const activeSort = sortButtonsContainer.querySelector('.active');
+        if (activeSort) activeSort.classList.remove('active');
+        targetButton.classList.add('active');
+
+        const allIcons = document.querySelectorAll('.sort-arrow-icon');
+        allIcons.forEach(icon => {
+            if (icon.dataset.sortIcon === currentSort.type) {
+                icon.style.opacity = 1;
+                icon.style.transform = currentSort.order === 'desc' ? 'rotate(180deg)' : 'rotate(0deg)';
+            } else {
+                icon.style.opacity = 0;
+            }
+        });
+
+        filterAndRender();
+    });
+
+    // Escape для закрытия модального окна
+    document.addEventListener('keydown', (event) => {
+        if (event.key === 'Escape' && modal.classList.contains('open')) {
+            closeModal();
+        }
+        if (event.key === 'Escape' && aiModal.classList.contains('open')) {
+            closeAiModal();
+        }
+    });
+
+    document.getElementById('close-ai-modal-btn').addEventListener('click', closeAiModal);
+    aiModal.addEventListener('click', (event) => {
+        if (event.target === aiModal) closeAiModal();
+    });
+    document.getElementById('ai-key-form').addEventListener('submit', handleAiKeySubmit);
+    document.getElementById('ai-chat-form').addEventListener('submit', handleAiChatSubmit);
+
+    console.log('Script loaded successfully');
+    console.log('Is authenticated:', isAuthenticated);
+    console.log('Read poems:', Array.from(readPoemsTitles));
+    console.log('Pinned poem:', pinnedPoemTitle);
+};
@@ -0,0 +1,29 @@
+/**
+ * Функция показа уведомлений (Toast)
+ */
+function showNotification(message, type = 'success') {
+    const container = document.getElementById('notification-container');
+    const notification = document.createElement('div');
+    notification.className = `p-3 rounded-lg shadow-md text-sm mb-2 opacity-0 transition-opacity duration-300 pointer-events-auto`;
+
+    if (type === 'success') {
+        notification.classList.add('bg-green-500', 'text-white');
+    } else if (type === 'error') {
+        notification.classList.add('bg-red-500', 'text-white');
+    } else {
+        notification.classList.add('bg-blue-500', 'text-white');
+    }
+    notification.textContent = message;
+
+    container.prepend(notification);
+
+    setTimeout(() => {
+        notification.classList.add('opacity-100');
+    }, 10);
+
+    setTimeout(() => {
+        notification.classList.remove('opacity-100');
+        notification.classList.add('opacity-0');
+        notification.addEventListener('transitionend', () => notification.remove());
+    }, 3000);
+}
@@ -0,0 +1,77 @@
+document.addEventListener('DOMContentLoaded', function () {
+    if (document.getElementById('generate-key-form')) {
+        const form = document.getElementById('generate-key-form');
+        const newKeyDisplay = document.getElementById('new-key-display');
+        const newKeyValue = document.getElementById('new-key-value');
+
+        form.addEventListener('submit', async function (e) {
+            e.preventDefault();
+            const expiresInHours = document.getElementById('expires_in_hours').value;
+            const dailyLimit = document.getElementById('daily_limit').value;
+
+            try {
+                const response = await fetch(`/ai/generate_key?expires_in_hours=${expiresInHours}&daily_limit=${dailyLimit}`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                });
+
+                if (response.ok) {
+                    const data = await response.json();
+                    newKeyValue.textContent = data.key;
+                    newKeyDisplay.classList.remove('hidden');
+                    loadKeys(); // Refresh the table
+                } else {
+                    alert('Не удалось сгенерировать ключ.');
+                }
+            } catch (error) {
+                console.error('Ошибка при генерации ключа:', error);
+            }
+        });
+
+        async function loadKeys() {
+            try {
+                const response = await fetch('/ai/get_keys');
+                if (response.ok) {
+                    const keys = await response.json();
+                    const tbody = document.getElementById('keys-table-body');
+                    tbody.innerHTML = '';
+                    keys.forEach(key => {
+                        const tr = document.createElement('tr');
+                        tr.innerHTML = `
+                            <td class="p-2 text-xs break-all"><code>${key.key}</code></td>
+                            <td class="p-2 text-sm">${key.is_active ? '<span class="text-green-600">Активен</span>' : '<span class="text-red-600">Отключен</span>'}</td>
+                            <td class="p-2">
+                                <button data-key="${key.key}" class="disable-key-btn text-red-500 hover:text-red-700 text-sm" ${!key.is_active ? 'disabled' : ''}>
+                                    Отключить
+                                </button>
+                            </td>
+                        `;
+                        tbody.appendChild(tr);
+                    });
+                }
+            } catch (error) {
+                console.error('Ошибка при загрузке ключей:', error);
+            }
+        }
+
+        document.getElementById('keys-table-body').addEventListener('click', async function(e) {
+            if (e.target && e.target.classList.contains('disable-key-btn')) {
+                const key = e.target.dataset.key;
+                if (confirm('Вы уверены, что хотите отключить этот ключ?')) {
+                    try {
+                        const response = await fetch(`/ai/disable_key/${key}`, { method: 'POST' });
+                        if (response.ok) {
+                            loadKeys();
+                        } else {
+                            alert('Не удалось отключить ключ.');
+                        }
+                    } catch (error) {
+                        console.error('Ошибка при отключении ключа:', error);
+                    }
+                }
+            }
+        });
+
+        loadKeys();
+    }
+});
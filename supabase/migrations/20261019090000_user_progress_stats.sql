@@ -0,0 +1,7 @@
+-- Инкрементальные счётчики прогресса пользователя (см. services/progress_service.py).
+-- Хранятся в строке пользователя, поэтому обновляются тем же запросом,
+-- что и read_poems_json, и приходят вместе с get_user без лишних запросов.
+alter table "user" add column if not exists progress_stats jsonb;
+
+-- Поиск читателей стиха при изменении каталога: read_poems_json @> '["title"]'
+create index if not exists user_read_poems_json_gin on "user" using gin (read_poems_json jsonb_path_ops);
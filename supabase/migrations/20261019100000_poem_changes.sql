@@ -0,0 +1,9 @@
+-- Журнал изменений каталога для дельта-синхронизации (/api/poems/changes).
+-- version монотонно растёт; op = 'upsert' несёт полную строку стиха, 'delete' — только название.
+create table if not exists poem_changes (
+    version bigint generated always as identity primary key,
+    op text not null check (op in ('upsert', 'delete')),
+    title text not null,
+    poem jsonb,
+    created_at timestamptz not null default now()
+);
@@ -0,0 +1,32 @@
+-- История чата читается по пользователю в порядке времени: индекс под оба запроса
+-- (окно контекста для Gemini и постраничная выдача /ai/history).
+create index if not exists ai_chat_history_username_created_at
+    on ai_chat_history (username, created_at desc);
+
+-- Старые реплики переносятся сюда пачками: payload — base64(zlib(JSON)) со списком сообщений.
+create table if not exists ai_chat_archive (
+    id bigint generated always as identity primary key,
+    username text not null,
+    from_ts timestamptz not null,
+    to_ts timestamptz not null,
+    message_count integer not null,
+    payload text not null,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists ai_chat_archive_username_to_ts
+    on ai_chat_archive (username, to_ts desc);
+
+-- Сообщения сверх лимита p_cap на пользователя (самые старые), не больше p_limit строк.
+create or replace function ai_chat_history_overflow(p_cap integer, p_limit integer)
+returns table (id bigint, username text, role text, content text, created_at timestamptz)
+language sql stable as $$
+    select h.id, h.username, h.role, h.content, h.created_at
+    from (
+        select *, row_number() over (partition by username order by created_at desc) as rn
+        from ai_chat_history
+    ) h
+    where h.rn > p_cap
+    order by h.username, h.created_at
+    limit p_limit;
+$$;
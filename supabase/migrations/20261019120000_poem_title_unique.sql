@@ -0,0 +1,3 @@
+-- Админские insert/update стихов выполняются одним запросом без предварительного select:
+-- конфликт названий ловит уникальный индекс (ошибка 23505 → HTTP 409).
+create unique index if not exists poem_title_key on poem (title);
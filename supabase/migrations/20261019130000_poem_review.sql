@@ -0,0 +1,29 @@
+-- Интервальные повторения (SM-2): состояние по строке на пользователя и стих.
+-- Переименование и удаление стиха переносятся сюда через внешний ключ на poem(title).
+create table if not exists poem_review (
+    username text not null,
+    title text not null references poem (title) on update cascade on delete cascade,
+    easiness real not null default 2.5,
+    repetitions integer not null default 0,
+    interval_days integer not null default 0,
+    due_at timestamptz not null default now(),
+    last_reviewed_at timestamptz,
+    primary key (username, title)
+);
+
+-- Очередь «к повторению»: диапазон по (username, due_at <= now()) без перебора всех стихов
+create index if not exists poem_review_username_due_at on poem_review (username, due_at);
+
+-- Уже прочитанные и изучаемые стихи сразу попадают в очередь
+insert into poem_review (username, title)
+select distinct u.username, p.title
+from "user" u
+cross join lateral (
+    select jsonb_array_elements_text(
+        case when jsonb_typeof(u.read_poems_json) = 'array' then u.read_poems_json else '[]'::jsonb end
+    ) as title
+    union
+    select u.pinned_poem_title
+) r
+join poem p on p.title = r.title
+on conflict (username, title) do nothing;
@@ -0,0 +1,57 @@
+-- Правка стиха одним запросом, с автором до записи: o — снимок строки на момент
+-- начала оператора, поэтому o.author остаётся прежним. Нет строки — возвращается null.
+create or replace function update_poem(p_original_title text, p_title text, p_author text, p_text text)
+returns jsonb
+language sql as $$
+    update poem p
+    set title = p_title, author = p_author, text = p_text
+    from poem o
+    where p.title = p_original_title and o.title = p_original_title
+    returning to_jsonb(p) || jsonb_build_object('old_author', o.author);
+$$;
+
+-- Перенос одного прочтения между авторами в progress_stats
+-- (та же логика, что в ProgressService.apply_toggle без серий).
+create or replace function progress_shift(p_stats jsonb, p_old_author text, p_new_author text)
+returns jsonb
+language plpgsql immutable as $$
+declare
+    v_authors jsonb := coalesce(p_stats -> 'authors', '{}'::jsonb);
+    v_read_count integer := coalesce((p_stats ->> 'read_count')::integer, 0);
+    v_left integer;
+begin
+    if p_old_author is not null then
+        v_read_count := greatest(0, v_read_count - 1);
+        v_left := coalesce((v_authors ->> p_old_author)::integer, 0) - 1;
+        if v_left > 0 then
+            v_authors := jsonb_set(v_authors, array[p_old_author], to_jsonb(v_left));
+        else
+            v_authors := v_authors - p_old_author;
+        end if;
+    end if;
+    if p_new_author is not null then
+        v_read_count := v_read_count + 1;
+        v_authors := jsonb_set(
+            v_authors, array[p_new_author],
+            to_jsonb(coalesce((v_authors ->> p_new_author)::integer, 0) + 1)
+        );
+    end if;
+    return p_stats || jsonb_build_object('read_count', v_read_count, 'authors', v_authors);
+end;
+$$;
+
+-- Все читатели стиха обновляются одним оператором; у кого счётчики ещё
+-- не заполнены, их посчитает ProgressService.get_progress при первом чтении.
+create or replace function shift_poem_readers(p_title text, p_old_author text, p_new_author text)
+returns integer
+language sql as $$
+    with shifted as (
+        update "user"
+        set progress_stats = progress_shift(progress_stats, p_old_author, p_new_author)
+        where read_poems_json @> jsonb_build_array(p_title)
+          and jsonb_typeof(progress_stats) = 'object'
+          and progress_stats ? 'read_count'
+        returning 1
+    )
+    select count(*)::integer from shifted;
+$$;
@@ -0,0 +1,30 @@
+-- Аренда фоновых задач, которые запускает каждый воркер (архивирование истории AI-чата).
+-- Сессионный pg_try_advisory_lock через PostgREST не удержать: каждый вызов RPC идёт
+-- своей транзакцией на произвольном соединении пула. Аренда с истечением переживает
+-- и это, и падение воркера посреди работы.
+create table if not exists job_lease (
+    name text primary key,
+    holder text not null,
+    expires_at timestamptz not null
+);
+
+-- true, если аренда свободна, истекла или уже принадлежит p_holder
+create or replace function try_acquire_job_lease(p_name text, p_holder text, p_ttl_seconds integer)
+returns boolean
+language sql as $$
+    with acquired as (
+        insert into job_lease (name, holder, expires_at)
+        values (p_name, p_holder, now() + make_interval(secs => p_ttl_seconds))
+        on conflict (name) do update
+            set holder = excluded.holder, expires_at = excluded.expires_at
+            where job_lease.expires_at < now() or job_lease.holder = excluded.holder
+        returning 1
+    )
+    select exists (select 1 from acquired);
+$$;
+
+create or replace function release_job_lease(p_name text, p_holder text)
+returns void
+language sql as $$
+    delete from job_lease where name = p_name and holder = p_holder;
+$$;
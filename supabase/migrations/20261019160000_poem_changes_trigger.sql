@@ -0,0 +1,83 @@
+-- Журнал изменений пишется в той же транзакции, что и сам стих: триггер ловит
+-- любую правку poem (админка, SQL-консоль, скрипты), и запись в журнал не может
+-- потеряться после того, как стих уже сохранён.
+create or replace function poem_log_change()
+returns trigger
+language plpgsql as $$
+begin
+    if tg_op = 'DELETE' then
+        insert into poem_changes (op, title) values ('delete', old.title);
+        return null;
+    end if;
+    if tg_op = 'UPDATE' and old.title <> new.title then
+        insert into poem_changes (op, title) values ('delete', old.title);
+    end if;
+    insert into poem_changes (op, title, poem)
+    values ('upsert', new.title, jsonb_build_object('title', new.title, 'author', new.author, 'text', new.text));
+    return null;
+end;
+$$;
+
+drop trigger if exists poem_log_change on poem;
+create trigger poem_log_change
+    after insert or update or delete on poem
+    for each row execute function poem_log_change();
+
+-- Админские правки возвращают строку стиха вместе с последней версией журнала
+-- (currval последовательности — версия, выданная триггером в этой транзакции)
+-- и числом версий, которые заняла правка: переименование — удаление и upsert.
+create or replace function add_poem(p_title text, p_author text, p_text text)
+returns jsonb
+language plpgsql as $$
+declare
+    v_row jsonb;
+begin
+    insert into poem as p (title, author, text)
+    values (p_title, p_author, p_text)
+    returning to_jsonb(p) into v_row;
+    return v_row || jsonb_build_object(
+        'version', currval(pg_get_serial_sequence('poem_changes', 'version')),
+        'changes', 1
+    );
+end;
+$$;
+
+-- o — снимок строки на момент начала оператора, поэтому o.author и o.title прежние.
+-- Нет строки — возвращается null.
+create or replace function update_poem(p_original_title text, p_title text, p_author text, p_text text)
+returns jsonb
+language plpgsql as $$
+declare
+    v_row jsonb;
+begin
+    update poem p
+    set title = p_title, author = p_author, text = p_text
+    from poem o
+    where p.title = p_original_title and o.title = p_original_title
+    returning to_jsonb(p) || jsonb_build_object(
+        'old_author', o.author,
+        'changes', case when o.title = p.title then 1 else 2 end
+    ) into v_row;
+    if v_row is null then
+        return null;
+    end if;
+    return v_row || jsonb_build_object('version', currval(pg_get_serial_sequence('poem_changes', 'version')));
+end;
+$$;
+
+create or replace function delete_poem(p_title text)
+returns jsonb
+language plpgsql as $$
+declare
+    v_row jsonb;
+begin
+    delete from poem p where p.title = p_title returning to_jsonb(p) into v_row;
+    if v_row is null then
+        return null;
+    end if;
+    return v_row || jsonb_build_object(
+        'version', currval(pg_get_serial_sequence('poem_changes', 'version')),
+        'changes', 1
+    );
+end;
+$$;